@@ -0,0 +1,112 @@
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+from fpl_bootstrap_parser import parse_players
+from fpl_http_cache import get_bootstrap_static
+
+
+def synthetic_bootstrap(n_players, n_teams=20, extra_fields=80, seed=0):
+    # bootstrap-static shaped payload. Real elements carry ~90 fields, so
+    # pad each one with filler fields the parsers have to skip over
+    rng = np.random.default_rng(seed)
+    teams = [{"id": i, "name": f"Team {i}"} for i in range(1, n_teams + 1)]
+    elements = [dict({
+        "id": i,
+        "web_name": f"Player {i}",
+        "team": int(rng.integers(1, n_teams + 1)),
+        "element_type": int(rng.integers(1, 5)),
+        "now_cost": int(rng.integers(40, 130)),
+        "total_points": int(rng.integers(0, 250)),
+        "minutes": int(rng.integers(0, 3420)),
+        "goals_scored": int(rng.integers(0, 25)),
+        "assists": int(rng.integers(0, 15)),
+        "clean_sheets": int(rng.integers(0, 20)),
+        "selected_by_percent": f"{rng.uniform(0, 60):.1f}",
+        "status": str(rng.choice(["a", "a", "a", "d", "i", "u"])),
+    }, **{f"field_{j}": j for j in range(extra_fields)}) for i in range(1, n_players + 1)]
+    return {"elements": elements, "teams": teams}
+
+
+def legacy_parse(data):
+    # The per-player list-append loop fpl_api_data_collection.py and
+    # utils.get_fpl_data used before parse_players, kept only for comparison
+    players = data["elements"]
+    player_ids, player_costs, player_points, player_names, player_teams, player_positions = [], [], [], [], [], []
+    player_minutes, player_goals_scored, player_assists, player_clean_sheets = [], [], [], []
+    player_selected_by_percent, player_statuses = [], []
+    for player in players:
+        player_ids.append(player["id"])
+        player_costs.append(player["now_cost"] / 10)
+        player_points.append(player["total_points"])
+        player_names.append(player["web_name"])
+        player_teams.append(data["teams"][player["team"] - 1]["name"])
+        player_positions.append(player["element_type"])
+        player_minutes.append(player["minutes"])
+        player_goals_scored.append(player["goals_scored"])
+        player_assists.append(player["assists"])
+        player_clean_sheets.append(player["clean_sheets"])
+        player_selected_by_percent.append(player["selected_by_percent"])
+        player_statuses.append(player["status"])
+
+    player_df = pd.DataFrame({
+        "Player ID": player_ids,
+        "Name": player_names,
+        "Team": player_teams,
+        "Position": player_positions,
+        "Cost": player_costs,
+        "Total Points": player_points,
+        "Minutes": player_minutes,
+        "Goals Scored": player_goals_scored,
+        "Assists": player_assists,
+        "Clean Sheets": player_clean_sheets,
+        "Selected By %": player_selected_by_percent,
+        "Status": player_statuses,
+    })
+    player_df["ROI"] = player_df["Total Points"] / player_df["Cost"]
+    player_df["Points per Minute"] = player_df["Total Points"] / player_df["Minutes"]
+    player_df["PpM ROI"] = (player_df["Total Points"] / player_df["Minutes"]) * player_df["ROI"]
+    return player_df
+
+
+def _measure(parse, data, repeats):
+    # Mean parse time, peak traced allocation and the frame's own footprint
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parse(data)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    tracemalloc.start()
+    player_df = parse(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, player_df.memory_usage(deep=True).sum()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time the columnar bootstrap-static parser against the legacy loops")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[700, 5000, 50000], help="Players per payload")
+    parser.add_argument("--repeats", type=int, default=5, help="Parses per timing")
+    parser.add_argument("--live", action="store_true", help="Also time the real (cached) bootstrap-static payload")
+    args = parser.parse_args()
+
+    payloads = [(f"synthetic {n}", synthetic_bootstrap(n)) for n in args.sizes]
+    if args.live:
+        payloads.append(("live", get_bootstrap_static()))
+
+    rows = []
+    for label, data in payloads:
+        for name, parse in (("legacy loops", legacy_parse), ("parse_players", parse_players)):
+            elapsed, peak, frame_bytes = _measure(parse, data, args.repeats)
+            rows.append({
+                'payload': label,
+                'parser': name,
+                'parse_ms': round(elapsed * 1000, 2),
+                'peak_alloc_mb': round(peak / 1e6, 2),
+                'frame_mb': round(frame_bytes / 1e6, 3),
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False))
@@ -1,94 +1,12 @@
-import requests
-import pandas as pd
+from fpl_bootstrap_parser import parse_players
+from fpl_http_cache import get_bootstrap_static
 
-# Set up the API endpoint URL
-url = "https://fantasy.premierleague.com/api/bootstrap-static/"
+data = get_bootstrap_static()
 
-# Send a GET request to the API endpoint
-response = requests.get(url)
-
-# Check if the request was successful (status code 200)
-if response.status_code == 200:
-    # Parse the response as JSON
-    data = response.json()
-
-    # Extract player data from the response
-    players = data["elements"]
-
-    # Lists to store player information
-    player_ids = []
-    player_costs = []
-    player_points = []
-    player_names = []
-    player_teams = []
-    player_positions = []
-    player_minutes = []
-    player_goals_scored = []
-    player_assists = []
-    player_clean_sheets = []
-    player_selected_by_percent = []
-    player_statuses = []
-
-    # Iterate over the players
-    for player in players:
-        player_id = player["id"]
-        player_cost = player["now_cost"] / 10  # Divide by 10 to get the actual cost
-        player_point = player["total_points"]
-        player_name = player["web_name"]
-        player_team = data["teams"][player["team"] - 1]["name"]
-        player_position = player["element_type"]
-        player_minute = player["minutes"]
-        player_goals = player["goals_scored"]
-        player_assist = player["assists"]
-        player_clean_sheet = player["clean_sheets"]
-        player_selected_by = player["selected_by_percent"]
-        player_status = player["status"]
-
-        # Append player information to the lists
-        player_ids.append(player_id)
-        player_costs.append(player_cost)
-        player_points.append(player_point)
-        player_names.append(player_name)
-        player_teams.append(player_team)
-        player_positions.append(player_position)
-        player_minutes.append(player_minute)
-        player_goals_scored.append(player_goals)
-        player_assists.append(player_assist)
-        player_clean_sheets.append(player_clean_sheet)
-        player_selected_by_percent.append(player_selected_by)
-        player_statuses.append(player_status)
-
-    # Create a DataFrame to store player information
-    player_df = pd.DataFrame(
-        {
-            "Player ID": player_ids,
-            "Name": player_names,
-            "Team": player_teams,
-            "Position": player_positions,
-            "Cost": player_costs,
-            "Total Points": player_points,
-            "Minutes": player_minutes,
-            "Goals Scored": player_goals_scored,
-            "Assists": player_assists,
-            "Clean Sheets": player_clean_sheets,
-            "Selected By %": player_selected_by_percent,
-            "Status": player_statuses,
-        }
-    )
-
-    # Calculate ROI (Return on Investment)
-    player_df["ROI"] = player_df["Total Points"] / player_df["Cost"]
-
-    # Calculate Points per Minute
-    player_df["Points per Minute"] = player_df["Total Points"] / player_df["Minutes"]
-
-    # Calculate Points per Minute * ROI
-    player_df["PpM ROI"] = (
-        player_df["Total Points"] / player_df["Minutes"]
-    ) * player_df["ROI"]
-
-    # Filter out players who are unavailable, injured, or suspended
-    player_df = player_df[player_df["Status"] == "a"]
+# Check if the request was successful
+if data is not None:
+    # Build the player frame in one columnar pass, keeping available players only
+    player_df = parse_players(data, available_only=True)
 
     # Save the DataFrame as a CSV file
     player_df.to_csv("player_data_23-24.csv", index=False)
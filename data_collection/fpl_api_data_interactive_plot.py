@@ -1,70 +1,20 @@
-import requests
 import plotly.express as px
-import pandas as pd
 
-# Set up the API endpoint URL
-url = "https://fantasy.premierleague.com/api/bootstrap-static/"
+from fpl_bootstrap_parser import parse_players, safe_divide
+from fpl_http_cache import get_bootstrap_static
 
-# Send a GET request to the API endpoint
-response = requests.get(url)
+data = get_bootstrap_static()
 
-# Check if the request was successful (status code 200)
-if response.status_code == 200:
-    # Parse the response as JSON
-    data = response.json()
-
-    # Extract player data from the response
-    players = data["elements"]
-
-    # Lists to store player information
-    player_ids = []
-    player_costs = []
-    player_points = []
-    player_names = []
-    player_teams = []
-    player_positions = []
-    player_minutes = []
-
-    # Iterate over the players
-    for player in players:
-        player_id = player["id"]
-        player_cost = player["now_cost"] / 10  # Divide by 10 to get the actual cost
-        player_point = player["total_points"]
-        player_name = player["web_name"]
-        player_team = data["teams"][player["team"] - 1]["name"]
-        player_position = player["element_type"]
-        player_minute = player["minutes"]
-
-        # Append player information to the lists
-        player_ids.append(player_id)
-        player_costs.append(player_cost)
-        player_points.append(player_point)
-        player_names.append(player_name)
-        player_teams.append(player_team)
-        player_positions.append(player_position)
-        player_minutes.append(player_minute)
-
-    # Create a DataFrame to store player information
-    player_df = pd.DataFrame(
-        {
-            "Player ID": player_ids,
-            "Name": player_names,
-            "Team": player_teams,
-            "Position": player_positions,
-            "Cost": player_costs,
-            "Total Points": player_points,
-            "Minutes": player_minutes,
-        }
+# Check if the request was successful
+if data is not None:
+    # Build the player frame (with ROI and Points per Minute) in one columnar pass
+    player_df = parse_players(
+        data, fields=["id", "now_cost", "total_points", "web_name", "team", "element_type", "minutes"]
     )
 
-    # Calculate ROI (Return on Investment)
-    player_df["ROI"] = player_df["Total Points"] / player_df["Cost"]
-
     # Calculate ROI (Return on Investment) using minutes played and points
-    player_df["ROI with minutes played"] = player_df["Total Points"] * player_df["Minutes"] / player_df["Cost"]
-    
-    # Calculate Points per Minute
-    player_df["Points per Minute"] = player_df["Total Points"] / player_df["Minutes"]
+    player_df["ROI with minutes played"] = safe_divide(player_df["Total Points"] * player_df["Minutes"],
+                                                       player_df["Cost"])
 
     # Filter the DataFrame to include only players with more than 50 minutes
     player_df = player_df[player_df["Minutes"] > 500]
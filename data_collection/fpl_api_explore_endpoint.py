@@ -1,16 +1,9 @@
-import requests
+from fpl_http_cache import get_bootstrap_static
 
-# Set up the API endpoint URL
-url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-
-# Send a GET request to the API endpoint
-response = requests.get(url)
-
-# Check if the request was successful (status code 200)
-if response.status_code == 200:
-    # Parse the response as JSON
-    data = response.json()
+data = get_bootstrap_static()
 
+# Check if the request was successful
+if data is not None:
     # Extract player data from the response
     players = data["elements"]
 
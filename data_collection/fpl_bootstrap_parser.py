@@ -0,0 +1,69 @@
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# bootstrap-static element fields, the player frame columns they become and
+# the dtype each is read as (None keeps Python objects, e.g. strings)
+PLAYER_FIELDS = {
+    "id": ("Player ID", np.int32),
+    "web_name": ("Name", None),
+    "team": ("Team", np.int16),
+    "element_type": ("Position", np.int8),
+    "now_cost": ("Cost", np.int16),
+    "total_points": ("Total Points", np.int32),
+    "minutes": ("Minutes", np.int32),
+    "goals_scored": ("Goals Scored", np.int16),
+    "assists": ("Assists", np.int16),
+    "clean_sheets": ("Clean Sheets", np.int16),
+    "selected_by_percent": ("Selected By %", np.float64),
+    "status": ("Status", None),
+}
+
+POSITIONS = [1, 2, 3, 4]
+STATUSES = ["a", "d", "i", "n", "s", "u"]
+
+
+def safe_divide(numerator, denominator):
+    # Elementwise division that gives 0 instead of inf/NaN where the denominator is 0
+    numerator, denominator = np.asarray(numerator, dtype=float), np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+def parse_players(data, fields=None, available_only=False):
+    # The player frame from a bootstrap-static payload, built column by column
+    # straight into typed arrays. fields picks a subset of PLAYER_FIELDS; teams
+    # are looked up by ID, so gaps or reordering in the teams list can't shift them
+    elements = data["elements"]
+    columns = {}
+    for field in fields or PLAYER_FIELDS:
+        column, dtype = PLAYER_FIELDS[field]
+        values = map(itemgetter(field), elements)
+        columns[column] = list(values) if dtype is None else np.fromiter(values, dtype=dtype, count=len(elements))
+    player_df = pd.DataFrame(columns)
+
+    if "Team" in player_df:
+        teams = sorted((team["id"], team["name"]) for team in data["teams"])
+        team_codes = np.full(max(teams)[0] + 1, -1)
+        team_codes[[team_id for team_id, _ in teams]] = np.arange(len(teams))
+        player_df["Team"] = pd.Categorical.from_codes(team_codes[player_df["Team"]], [name for _, name in teams])
+    if "Position" in player_df:
+        player_df["Position"] = pd.Categorical(player_df["Position"], categories=POSITIONS)
+    if "Status" in player_df:
+        player_df["Status"] = pd.Categorical(player_df["Status"], categories=STATUSES)
+    if "Cost" in player_df:
+        player_df["Cost"] = player_df["Cost"] / 10  # now_cost is in tenths of a million
+
+    # ROI (Return on Investment), Points per Minute and Points per Minute * ROI
+    if {"Total Points", "Cost"} <= set(player_df):
+        player_df["ROI"] = safe_divide(player_df["Total Points"], player_df["Cost"])
+    if {"Total Points", "Minutes"} <= set(player_df):
+        player_df["Points per Minute"] = safe_divide(player_df["Total Points"], player_df["Minutes"])
+    if {"ROI", "Points per Minute"} <= set(player_df):
+        player_df["PpM ROI"] = player_df["Points per Minute"] * player_df["ROI"]
+
+    # Filter out players who are unavailable, injured, or suspended
+    if available_only:
+        player_df = player_df[player_df["Status"] == "a"]
+
+    return player_df
@@ -0,0 +1,30 @@
+import os
+
+# Live origins of everything the collectors fetch
+ORIGINS = {
+    "fpl": "https://fantasy.premierleague.com/api/",
+    "news": "https://newsapi.org/v2/",
+    "rss": "http://feeds.bbci.co.uk/sport/football/",
+    "guardian": "https://www.theguardian.com/football/",
+    "skysports": "https://www.skysports.com/",
+    "premierleague": "https://www.premierleague.com/",
+}
+
+# Club and press RSS feeds ingested on every refresh, by the environment
+# variable overriding each: (service, path below the service's origin)
+RSS_FEED_SOURCES = {
+    "RSS_URL": ("rss", "rss.xml"),
+    "GUARDIAN_RSS_URL": ("guardian", "premierleague/rss"),
+    "SKYSPORTS_RSS_URL": ("skysports", "rss/12040"),
+    "PREMIERLEAGUE_RSS_URL": ("premierleague", "rss"),
+}
+
+# Roots the collectors actually use. Each can be overridden from the
+# environment, e.g. to point every script at fpl_replay_server.py
+FPL_API_URL = os.getenv("FPL_API_URL", ORIGINS["fpl"])
+NEWS_API_URL = os.getenv("NEWS_API_URL", ORIGINS["news"])
+RSS_FEEDS = [os.getenv(variable, ORIGINS[service] + path) for variable, (service, path) in RSS_FEED_SOURCES.items()]
+RSS_URL = RSS_FEEDS[0]
+
+# Responses worth retrying: rate limited or a server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
@@ -0,0 +1,165 @@
+import os
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+STORE_DIR = "feature_store"
+
+# Rolling windows, in games, of the precomputed form features
+FORM_WINDOWS = (3, 5, 10)
+
+# Raw per-game columns kept from element-summary/<id>/ history
+HISTORY_COLUMNS = {
+    "element": "int32",
+    "fixture": "int32",
+    "round": "int16",
+    "opponent_team": "int16",
+    "was_home": "bool",
+    "minutes": "int16",
+    "total_points": "int16",
+    "goals_scored": "int16",
+    "assists": "int16",
+    "clean_sheets": "int16",
+    "bonus": "int16",
+    "bps": "int16",
+    "expected_goals": "float32",
+    "expected_assists": "float32",
+    "expected_goal_involvements": "float32",
+    "value": "int16",
+    "selected": "int32",
+}
+
+# Stats averaged over each rolling window
+ROLLING_STATS = ["total_points", "minutes", "expected_goals", "expected_assists", "expected_goal_involvements"]
+
+
+def _store_path(season, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"{season}.arrow")
+
+
+def clean_history(history_df):
+    # Keep the known columns with compact dtypes, one row per player and fixture.
+    # The API sends the expected_* stats as strings and older seasons lack them
+    history_df = history_df.reindex(columns=list(HISTORY_COLUMNS))
+    for column in ("expected_goals", "expected_assists", "expected_goal_involvements"):
+        history_df[column] = pd.to_numeric(history_df[column], errors="coerce")
+    history_df = history_df.fillna({column: 0 for column, dtype in HISTORY_COLUMNS.items() if dtype != "float32"})
+    history_df = history_df.astype(HISTORY_COLUMNS)
+
+    return history_df.drop_duplicates(["element", "round", "fixture"], keep="last") \
+        .sort_values(["element", "round", "fixture"], ignore_index=True)
+
+
+def rolling_features(history_df):
+    # Means over each player's last 3/5/10 games up to and including each
+    # game, for every row at once: a running sum minus the running sum
+    # `window` rows earlier, or just before the player's first game if that
+    # is closer. Missing stats (expected_* before they existed) are left out
+    # of the mean through a running count of observed values, and a window
+    # with none is NaN. Rows must be sorted by element then round
+    element = history_df["element"].to_numpy()
+    rows = np.arange(len(element))
+    first_rows = np.flatnonzero(np.r_[True, element[1:] != element[:-1]])
+    player_start = np.repeat(first_rows, np.diff(np.r_[first_rows, len(element)]))
+    values = history_df[ROLLING_STATS].to_numpy(dtype=np.float64)
+    observed = ~np.isnan(values)
+    cumulative = np.cumsum(np.where(observed, values, 0), axis=0)
+    counted = np.cumsum(observed, axis=0)
+
+    features = {}
+    for window in FORM_WINDOWS:
+        base_rows = np.maximum(rows - window, player_start - 1)
+        has_base = (base_rows >= 0)[:, None]
+        base = np.where(has_base, cumulative[np.maximum(base_rows, 0)], 0)
+        base_count = np.where(has_base, counted[np.maximum(base_rows, 0)], 0)
+        counts = counted - base_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, (cumulative - base) / counts, np.nan).astype(np.float32)
+
+        for j, stat in enumerate(ROLLING_STATS):
+            features[f"form_{window}" if stat == "total_points" else f"{stat}_{window}"] = means[:, j]
+        features[f"minutes_share_{window}"] = features.pop(f"minutes_{window}") / np.float32(90)
+
+    return history_df.assign(**features)
+
+
+def write_season(history_df, season, store_dir=STORE_DIR):
+    # Uncompressed Arrow IPC (Feather v2) so loads can memory-map the file and
+    # read only the columns they ask for without copying the rest
+    os.makedirs(store_dir, exist_ok=True)
+    table = pa.Table.from_pandas(rolling_features(clean_history(history_df)), preserve_index=False)
+    path = _store_path(season, store_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def append_history(history_df, season, store_dir=STORE_DIR):
+    # Add new games (e.g. the latest gameweek) to a season. Rolling features
+    # of a player depend on all his earlier games, so the season is rebuilt
+    # from the stored raw columns plus the new rows, which is a single
+    # vectorised pass
+    path = _store_path(season, store_dir)
+    if os.path.exists(path):
+        stored = feather.read_table(path, columns=list(HISTORY_COLUMNS), memory_map=True).to_pandas()
+        history_df = pd.concat([stored, history_df], ignore_index=True)
+
+    return write_season(history_df, season, store_dir)
+
+
+def load_features(season, columns=None, players=None, gameweeks=None, store_dir=STORE_DIR, as_table=False):
+    # Memory-mapped, column-selective read of one season. players and
+    # gameweeks optionally filter rows on element and round
+    table = feather.read_table(_store_path(season, store_dir), columns=columns, memory_map=True)
+    if players is not None or gameweeks is not None:
+        keep_columns = table.column_names
+        filter_table = feather.read_table(_store_path(season, store_dir), columns=["element", "round"],
+                                          memory_map=True)
+        mask = pa.array(np.ones(len(table), dtype=bool))
+        if players is not None:
+            mask = pc.and_(mask, pc.is_in(filter_table["element"], pa.array(players, type=pa.int32())))
+        if gameweeks is not None:
+            mask = pc.and_(mask, pc.is_in(filter_table["round"], pa.array(gameweeks, type=pa.int16())))
+        table = table.filter(mask).select(keep_columns)
+
+    return table if as_table else table.to_pandas()
+
+
+def seasons(store_dir=STORE_DIR):
+    # Seasons held in the store, oldest first
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(name[:-len(".arrow")] for name in os.listdir(store_dir) if name.endswith(".arrow"))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build the per-player gameweek feature store and time column loads")
+    parser.add_argument("--history", default="player_history_23-24.csv", help="Per-gameweek player history CSV")
+    parser.add_argument("--season", default="23-24", help="Season label of the history")
+    parser.add_argument("--store_dir", default=STORE_DIR, help="Feature store directory")
+    parser.add_argument("--columns", nargs="+", default=["element", "round", "form_5", "minutes_share_5"],
+                        help="Columns to load in the timing comparison")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    history = pd.read_csv(args.history)
+    csv_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    path = write_season(history, args.season, args.store_dir)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features = load_features(args.season, columns=args.columns, store_dir=args.store_dir)
+    load_time = time.perf_counter() - start
+
+    print(f"{len(history)} games, {os.path.getsize(path) / 1e6:.1f}MB store built in {build_time * 1000:.1f}ms")
+    print(f"Full CSV parse: {csv_time * 1000:.1f}ms, load of {len(args.columns)} columns: {load_time * 1000:.1f}ms")
+    print(features.tail())
@@ -0,0 +1,193 @@
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import requests
+
+from fpl_endpoints import FPL_API_URL
+
+# Base URL for the FPL API
+base_url = FPL_API_URL
+
+MATRIX_FILE = "fixture_matrix.npz"
+N_TEAMS = 20
+N_GAMEWEEKS = 38
+
+# Expected goals model: home sides score this much more than the average, and
+# team scoring and conceding rates are shrunk towards PRIOR_GOALS per game by
+# this many games. The prior is fixed rather than the live league average, so
+# a new result only moves the rates of the two teams that played it
+HOME_ADVANTAGE = 1.15
+PRIOR_GAMES = 5
+PRIOR_GOALS = 1.4
+
+FIXTURE_FIELDS = ["id", "event", "team_h", "team_a", "team_h_difficulty", "team_a_difficulty", "finished",
+                  "team_h_score", "team_a_score"]
+
+# Team x gameweek arrays held in the matrix, indexed directly by team ID and
+# gameweek (row and column 0 are unused). rate_for/rate_against are expected
+# goals times the league average: the average is applied at read time by
+# expected_goals, so a change in it doesn't touch the stored cells
+MATRIX_ARRAYS = ["fixture_count", "home_count", "difficulty", "rate_for", "rate_against"]
+
+
+def fixtures_arrays(fixtures):
+    # fixtures/ as a list of dicts or a (json_normalize'd) DataFrame, to one
+    # int array per field. Unscheduled fixtures get event 0 and missing scores -1
+    fixtures_df = pd.DataFrame(fixtures).reindex(columns=FIXTURE_FIELDS)
+    fixtures_df["finished"] = fixtures_df["finished"].fillna(False).astype(bool)
+    fixtures_df = fixtures_df.fillna({"event": 0, "team_h_score": -1, "team_a_score": -1,
+                                      "team_h_difficulty": 0, "team_a_difficulty": 0})
+    return {field: fixtures_df[field].to_numpy(dtype=np.int64) for field in FIXTURE_FIELDS}
+
+
+def team_strengths(fx, n_teams=N_TEAMS):
+    # Attack and defence rates (shrunk goals scored and conceded per game) and
+    # the league average goals per team per game, from finished fixtures
+    done = fx["finished"].astype(bool)
+    home, away = fx["team_h"][done], fx["team_a"][done]
+    home_goals, away_goals = fx["team_h_score"][done], fx["team_a_score"][done]
+
+    games = np.bincount(home, minlength=n_teams + 1) + np.bincount(away, minlength=n_teams + 1)
+    scored = np.bincount(home, home_goals, n_teams + 1) + np.bincount(away, away_goals, n_teams + 1)
+    conceded = np.bincount(home, away_goals, n_teams + 1) + np.bincount(away, home_goals, n_teams + 1)
+    average = (home_goals.sum() + away_goals.sum()) / max(2 * done.sum(), 1) or 1.0
+
+    attack = (scored + PRIOR_GAMES * PRIOR_GOALS) / (games + PRIOR_GAMES)
+    defence = (conceded + PRIOR_GAMES * PRIOR_GOALS) / (games + PRIOR_GAMES)
+    return attack, defence, average
+
+
+def _fixture_cells(fx, cells, attack, defence, n_teams, n_gameweeks):
+    # Matrix values of the (team x gameweek boolean mask) cells, from every
+    # scheduled fixture that falls in them
+    rows = {name: np.zeros((n_teams + 1, n_gameweeks + 1)) for name in MATRIX_ARRAYS}
+    event, home, away = fx["event"], fx["team_h"], fx["team_a"]
+    home_rate = attack[home] * defence[away] * HOME_ADVANTAGE
+    away_rate = attack[away] * defence[home] / HOME_ADVANTAGE
+
+    for side, difficulty, rate_for, rate_against, at_home in (
+        (home, fx["team_h_difficulty"], home_rate, away_rate, 1),
+        (away, fx["team_a_difficulty"], away_rate, home_rate, 0),
+    ):
+        keep = (event > 0) & cells[side, np.clip(event, 0, n_gameweeks)]
+        cell = (side[keep], event[keep])
+        np.add.at(rows["fixture_count"], cell, 1)
+        np.add.at(rows["home_count"], cell, at_home)
+        np.add.at(rows["difficulty"], cell, difficulty[keep])
+        np.add.at(rows["rate_for"], cell, rate_for[keep])
+        np.add.at(rows["rate_against"], cell, rate_against[keep])
+
+    # Difficulty is the mean over the gameweek's fixtures, NaN on a blank
+    with np.errstate(invalid="ignore"):
+        rows["difficulty"] = rows["difficulty"] / rows["fixture_count"]
+    return rows
+
+
+def build_fixture_matrix(fixtures, team_names=None, n_teams=N_TEAMS, n_gameweeks=N_GAMEWEEKS):
+    # team_names optionally lists the team names in ID order (bootstrap-static teams)
+    fx = fixtures_arrays(fixtures)
+    attack, defence, average = team_strengths(fx, n_teams)
+    matrix = _fixture_cells(fx, np.ones((n_teams + 1, n_gameweeks + 1), dtype=bool), attack, defence, n_teams,
+                            n_gameweeks)
+
+    # Keep the fixtures and strengths the matrix was built from, to diff refreshes against
+    matrix.update({f"fixture_{field}": values for field, values in fx.items()})
+    matrix.update({"attack": attack, "defence": defence, "average": np.array(average)})
+    matrix["team_names"] = np.array([""] + list(team_names or [""] * n_teams))
+    return matrix
+
+
+def refresh_fixture_matrix(matrix, fixtures):
+    # Recompute only the cells a new fixtures/ pull changes. Returns the
+    # updated matrix and the team x gameweek mask of recomputed cells
+    n_teams, n_gameweeks = matrix["fixture_count"].shape[0] - 1, matrix["fixture_count"].shape[1] - 1
+    old = {field: matrix[f"fixture_{field}"] for field in FIXTURE_FIELDS}
+    fx = fixtures_arrays(fixtures)
+
+    # Fixtures that were added, removed, rescheduled or finished. Both the old
+    # and the new version count, so a rescheduled fixture clears its old week
+    _, old_rows, new_rows = np.intersect1d(old["id"], fx["id"], return_indices=True)
+    old_affected = np.ones(len(old["id"]), dtype=bool)
+    new_affected = np.ones(len(fx["id"]), dtype=bool)
+    differs = np.any([old[field][old_rows] != fx[field][new_rows] for field in FIXTURE_FIELDS], axis=0)
+    old_affected[old_rows], new_affected[new_rows] = differs, differs
+
+    # A new result moves the rates of the two teams that played it, which
+    # changes the expected goals of every fixture either of them plays
+    attack, defence, average = team_strengths(fx, n_teams)
+    moved = np.flatnonzero(~np.isclose(attack, matrix["attack"]) | ~np.isclose(defence, matrix["defence"]))
+    new_affected |= np.isin(fx["team_h"], moved) | np.isin(fx["team_a"], moved)
+
+    cells = np.zeros((n_teams + 1, n_gameweeks + 1), dtype=bool)
+    for version, affected in ((old, old_affected), (fx, new_affected)):
+        affected &= (version["event"] > 0) & (version["event"] <= n_gameweeks)
+        cells[version["team_h"][affected], version["event"][affected]] = True
+        cells[version["team_a"][affected], version["event"][affected]] = True
+
+    matrix = dict(matrix)
+    if cells.any():
+        values = _fixture_cells(fx, cells, attack, defence, n_teams, n_gameweeks)
+        for name in MATRIX_ARRAYS:
+            matrix[name] = matrix[name].copy()
+            matrix[name][cells] = values[name][cells]
+    matrix.update({f"fixture_{field}": values for field, values in fx.items()})
+    matrix.update({"attack": attack, "defence": defence, "average": np.array(average)})
+    return matrix, cells
+
+
+def save_fixture_matrix(matrix, path=MATRIX_FILE):
+    np.savez(path, **matrix)
+
+
+def load_fixture_matrix(path=MATRIX_FILE):
+    with np.load(path) as stored:
+        return {name: stored[name] for name in stored.files}
+
+
+def team_ids(matrix, names):
+    # Team IDs for an array of team names (e.g. the Team column of the player data)
+    lookup = {name: team_id for team_id, name in enumerate(matrix["team_names"]) if name}
+    return np.array([lookup.get(name, 0) for name in names])
+
+
+def expected_goals(matrix, side="for"):
+    # Team x gameweek expected goals for or against: the stored rates over
+    # the league average of the latest pull
+    return matrix[f"rate_{side}"] / float(matrix["average"])
+
+
+def fixture_scale(matrix, ids, gameweeks):
+    # Team ID array x gameweeks multiplier of a team's expected goals that
+    # week against its average per fixture: 0 on a blank, about 2 on a double
+    # gameweek, above 1 for easy fixtures. A pure array lookup, no filtering
+    xg = expected_goals(matrix)
+    per_fixture = xg[:, 1:].sum(axis=1) / np.maximum(matrix["fixture_count"][:, 1:].sum(axis=1), 1)
+    return xg[np.asarray(ids)[:, None], np.asarray(gameweeks)[None, :]] / np.maximum(per_fixture[ids], 1e-9)[:, None]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build or refresh the team x gameweek fixture matrix")
+    parser.add_argument("--fixtures", default=None, help="fixtures CSV (default: download fixtures/)")
+    parser.add_argument("--matrix", default=MATRIX_FILE, help="Fixture matrix file")
+    parser.add_argument("--refresh", action="store_true", help="Refresh the existing matrix instead of rebuilding")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = pd.read_csv(args.fixtures)
+    else:
+        fixtures = requests.get(base_url + "fixtures/").json()
+
+    start = time.perf_counter()
+    if args.refresh:
+        matrix, cells = refresh_fixture_matrix(load_fixture_matrix(args.matrix), fixtures)
+        print(f"Recomputed {cells.sum()} cells of teams {np.flatnonzero(cells.any(axis=1)).tolist()}")
+    else:
+        team_names = [team["name"] for team in requests.get(base_url + "bootstrap-static/").json()["teams"]]
+        matrix = build_fixture_matrix(fixtures, team_names)
+    print(f"Fixture matrix ready in {(time.perf_counter() - start) * 1000:.1f}ms")
+    save_fixture_matrix(matrix, args.matrix)
+
+    print(pd.DataFrame(matrix["difficulty"][1:, 1:], index=matrix["team_names"][1:],
+                       columns=range(1, matrix["difficulty"].shape[1])).round(1).iloc[:, :10])
@@ -0,0 +1,158 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from argparse import ArgumentParser
+
+import aiohttp
+import requests
+
+from fpl_endpoints import FPL_API_URL
+
+BOOTSTRAP_STATIC_URL = FPL_API_URL + "bootstrap-static/"
+
+# One cache shared by every script, whatever directory it runs from
+CACHE_DIR = os.getenv("FPL_HTTP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fpl_http"))
+
+# Responses younger than this are served without contacting the server at all
+TTL_SECONDS = 300
+
+
+def _entry_paths(url, cache_dir):
+    # Gzipped body and JSON metadata (validators and fetch time) per URL
+    key = hashlib.sha256(url.encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{key}.json.gz"), os.path.join(cache_dir, f"{key}.meta.json")
+
+
+def _read_entry(url, cache_dir):
+    # (meta, body), or (None, None) when there is no complete entry. The meta
+    # records the checksum of its body, so a body replaced by a write that
+    # crashed before its meta doesn't pass as matching the old validators
+    body_path, meta_path = _entry_paths(url, cache_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with gzip.open(body_path, "rb") as f:
+            body = f.read()
+    except (FileNotFoundError, EOFError, OSError, json.JSONDecodeError):
+        return None, None
+    if meta.get("body_crc32", zlib.crc32(body)) != zlib.crc32(body):
+        return None, None
+    return meta, body
+
+
+def _write_entry(url, cache_dir, meta, body=None):
+    # Both files are written to temporary files first and then moved into
+    # place, meta last, so concurrent scripts never read a partial file. body
+    # is None when only the metadata changed (a 304)
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, meta_path = _entry_paths(url, cache_dir)
+    suffix = f".{os.getpid()}.tmp"
+    if body is not None:
+        meta = dict(meta, body_crc32=zlib.crc32(body))
+        with gzip.open(body_path + suffix, "wb", compresslevel=6) as f:
+            f.write(body)
+    with open(meta_path + suffix, "w") as f:
+        json.dump(meta, f)
+    if body is not None:
+        os.replace(body_path + suffix, body_path)
+    os.replace(meta_path + suffix, meta_path)
+
+
+def _validators(meta):
+    # Conditional request headers from a stored entry
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _handle_response(url, cache_dir, meta, body, status, headers, content, parse=json.loads):
+    # Shared by the sync and async getters: store what came back and return
+    # the parsed body, or None when there's neither a fresh nor a stored copy
+    now = time.time()
+    if status == 304 and body is not None:
+        _write_entry(url, cache_dir, dict(meta, fetched_at=now))
+        return parse(body)
+    if status == 200:
+        _write_entry(url, cache_dir, {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": now,
+        }, content)
+        return parse(content)
+
+    # Serve a stale copy rather than nothing if the server is failing
+    logging.error(f"Error fetching {url}: {status}")
+    if body is not None:
+        logging.warning(f"Serving the cached copy of {url} from {time.ctime(meta['fetched_at'])}")
+        return parse(body)
+    return None
+
+
+def cached_get_json(url, ttl=TTL_SECONDS, cache_dir=CACHE_DIR, timeout=30):
+    # GET a JSON endpoint through the cache: no request within the TTL, then
+    # a conditional request that costs a 304 if nothing changed
+    meta, body = _read_entry(url, cache_dir)
+    if body is not None and time.time() - meta["fetched_at"] < ttl:
+        return json.loads(body)
+
+    try:
+        response = requests.get(url, headers=_validators(meta if body is not None else None), timeout=timeout)
+        status, headers, content = response.status_code, response.headers, response.content
+    except requests.RequestException as e:
+        status, headers, content = repr(e), {}, None
+    return _handle_response(url, cache_dir, meta, body, status, headers, content)
+
+
+async def cached_fetch_json(session, url, ttl=TTL_SECONDS, cache_dir=CACHE_DIR, parse=json.loads):
+    # aiohttp version of cached_get_json, sharing the same cache entries.
+    # parse turns the raw body into the return value (see cached_fetch_bytes)
+    meta, body = _read_entry(url, cache_dir)
+    if body is not None and time.time() - meta["fetched_at"] < ttl:
+        return parse(body)
+
+    try:
+        async with session.get(url, headers=_validators(meta if body is not None else None)) as response:
+            status, headers, content = response.status, response.headers, await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        status, headers, content = repr(e), {}, None
+    return _handle_response(url, cache_dir, meta, body, status, headers, content, parse)
+
+
+async def cached_fetch_bytes(session, url, ttl=TTL_SECONDS, cache_dir=CACHE_DIR):
+    # The raw body of a non-JSON resource (e.g. an RSS feed) through the cache
+    return await cached_fetch_json(session, url, ttl, cache_dir, parse=bytes)
+
+
+def get_bootstrap_static(ttl=TTL_SECONDS):
+    # bootstrap-static through the shared HTTP cache, so calls within the TTL
+    # don't hit the API at all; None if it can't be retrieved and there's no
+    # cached copy
+    return cached_get_json(BOOTSTRAP_STATIC_URL, ttl=ttl)
+
+
+async def fetch_bootstrap_static(session, ttl=TTL_SECONDS):
+    return await cached_fetch_json(session, BOOTSTRAP_STATIC_URL, ttl=ttl)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Fetch bootstrap-static through the shared HTTP cache")
+    parser.add_argument("--url", default=BOOTSTRAP_STATIC_URL, help="JSON endpoint to fetch")
+    parser.add_argument("--ttl", type=float, default=TTL_SECONDS, help="Seconds a cached response is served as is")
+    args = parser.parse_args()
+
+    for label, ttl in (("First fetch", args.ttl), ("Within TTL", args.ttl), ("Revalidated", 0)):
+        start = time.perf_counter()
+        data = cached_get_json(args.url, ttl=ttl)
+        print(f"{label}: {(time.perf_counter() - start) * 1000:.1f}ms")
+    body_path, _ = _entry_paths(args.url, CACHE_DIR)
+    if os.path.exists(body_path):
+        print(f"Cached body: {os.path.getsize(body_path) / 1e6:.2f}MB gzipped")
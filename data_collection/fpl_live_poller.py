@@ -0,0 +1,168 @@
+import asyncio
+import inspect
+import logging
+from argparse import ArgumentParser
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from fpl_endpoints import FPL_API_URL, RETRY_STATUSES
+from fpl_http_cache import get_bootstrap_static
+
+base_url = FPL_API_URL
+
+# Per-player stats of event/<event_id>/live/ that are tracked and diffed
+LIVE_STATS = [
+    "minutes", "goals_scored", "assists", "clean_sheets", "goals_conceded", "own_goals", "penalties_saved",
+    "penalties_missed", "yellow_cards", "red_cards", "saves", "bonus", "bps", "total_points",
+]
+
+# Polling interval bounds in seconds. The interval drops to the minimum as
+# soon as a poll sees changes and grows by BACKOFF after each quiet poll, so
+# live matches are followed closely and quiet spells cost few requests
+MIN_INTERVAL = 20
+MAX_INTERVAL = 300
+BACKOFF = 1.5
+
+
+def live_table(data):
+    # Players x LIVE_STATS integer table of one live response, indexed by player ID
+    elements = data["elements"]
+    ids = np.fromiter((element["id"] for element in elements), dtype=np.int32, count=len(elements))
+    stats = np.array([[element["stats"].get(stat, 0) for stat in LIVE_STATS] for element in elements],
+                     dtype=np.int32).reshape(len(elements), len(LIVE_STATS))
+    return pd.DataFrame(stats, index=pd.Index(ids, name="id"), columns=LIVE_STATS)
+
+
+def diff_live(previous, current):
+    # Changed stats between two live tables, as one JSON-ready dict per player
+    # holding only the stats that changed. Players missing from `previous`
+    # count as all zeros, which is what the live table holds before kickoff
+    previous = previous.reindex(index=current.index, columns=LIVE_STATS, fill_value=0)
+    old, new = previous.to_numpy(), current.to_numpy()
+    changed = old != new
+
+    deltas = []
+    for row in np.flatnonzero(changed.any(axis=1)):
+        columns = np.flatnonzero(changed[row])
+        delta = {"id": int(current.index[row])}
+        delta.update({LIVE_STATS[column]: int(new[row, column]) for column in columns})
+        deltas.append(delta)
+    return deltas
+
+
+def next_interval(interval, changed, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+    return min_interval if changed else min(interval * BACKOFF, max_interval)
+
+
+async def _fetch_live(session, url, etag=None):
+    # Conditional GET of the live endpoint: (status, etag, data). An
+    # unchanged response comes back as a bodyless 304
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                return 200, response.headers.get("ETag"), await response.json()
+            return response.status, etag, None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.warning(f"Error polling {url}: {e!r}")
+        return None, etag, None
+
+
+async def poll_live(session, event_id, subscribers, api_url=base_url, min_interval=MIN_INTERVAL,
+                    max_interval=MAX_INTERVAL, max_polls=None, state=None, stop=None):
+    # Poll event/<event_id>/live/ until cancelled (or max_polls polls, or
+    # `stop()` returns True after a poll) and call every subscriber with the
+    # list of player deltas whenever a poll changes something. Subscribers
+    # may be plain functions or coroutines. `state`, if given, is kept up to
+    # date with the latest full table ("table") and poll count ("polls") for
+    # late joiners
+    url = f"{api_url}event/{event_id}/live/"
+    previous = pd.DataFrame(columns=LIVE_STATS, dtype=np.int32)
+    etag, interval, polls = None, min_interval, 0
+
+    while max_polls is None or polls < max_polls:
+        status, etag, data = await _fetch_live(session, url, etag)
+        polls += 1
+        deltas = []
+        if data is not None:
+            current = live_table(data)
+            deltas = diff_live(previous, current)
+            previous = current
+            if state is not None:
+                state["table"] = current
+        elif status != 304:
+            logging.warning(f"Live poll of gameweek {event_id} failed: {status}")
+        if state is not None:
+            state["polls"] = polls
+
+        if deltas:
+            for subscriber in subscribers:
+                result = subscriber(deltas)
+                if inspect.isawaitable(result):
+                    await result
+        if stop is not None and stop():
+            break
+
+        # Back off harder when rate limited or the server is failing
+        interval = next_interval(interval, bool(deltas), min_interval, max_interval)
+        if status in RETRY_STATUSES:
+            interval = max_interval
+        if max_polls is None or polls < max_polls:
+            await asyncio.sleep(interval)
+
+    return previous
+
+
+async def run_live_poller(event_id, subscribers, state=None, **kwargs):
+    # poll_live with its own session, e.g. for a background thread's event loop
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        return await poll_live(session, event_id, subscribers, state=state, **kwargs)
+
+
+def squad_points_printer(squad, names):
+    # CLI subscriber: the changed stats and the squad's running total
+    totals = {}
+
+    def show(deltas):
+        for delta in deltas:
+            if "total_points" in delta:
+                totals[delta["id"]] = delta["total_points"]
+            changes = ", ".join(f"{stat} {value}" for stat, value in delta.items() if stat != "id")
+            marker = "*" if delta["id"] in squad else " "
+            print(f"{marker} {names.get(delta['id'], delta['id'])}: {changes}")
+        if squad:
+            print(f"Squad points: {sum(totals.get(player_id, 0) for player_id in squad)}")
+
+    return show
+
+
+def current_event(data):
+    # The gameweek in progress (or last started) according to bootstrap-static
+    events = [event["id"] for event in data["events"] if event["is_current"]]
+    return events[0] if events else max(event["id"] for event in data["events"] if event["finished"])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = ArgumentParser(description="Poll live gameweek points and print changes as they happen")
+    parser.add_argument("--event", type=int, default=None, help="Gameweek to follow (default: the current one)")
+    parser.add_argument("--squad", type=int, nargs="*", default=[], help="Player IDs whose points to total")
+    parser.add_argument("--base_url", default=base_url, help="API base URL (e.g. a local stub server)")
+    parser.add_argument("--min_interval", type=float, default=MIN_INTERVAL, help="Seconds between polls when active")
+    parser.add_argument("--max_interval", type=float, default=MAX_INTERVAL, help="Seconds between polls when quiet")
+    parser.add_argument("--max_polls", type=int, default=None, help="Stop after this many polls")
+    args = parser.parse_args()
+
+    bootstrap = get_bootstrap_static() or {"elements": [], "events": []}
+    names = {player["id"]: player["web_name"] for player in bootstrap["elements"]}
+    event_id = args.event or current_event(bootstrap)
+
+    try:
+        asyncio.run(run_live_poller(event_id, [squad_points_printer(set(args.squad), names)], api_url=args.base_url,
+                                    min_interval=args.min_interval, max_interval=args.max_interval,
+                                    max_polls=args.max_polls))
+    except KeyboardInterrupt:
+        pass
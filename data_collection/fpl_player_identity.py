@@ -0,0 +1,197 @@
+import os
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+INDEX_FILE = "player_identity.csv"
+
+INDEX_COLUMNS = ["player_key", "season", "player_id", "code", "name", "name_key", "team", "position", "match",
+                 "score"]
+
+# Dtypes of the index columns, so an empty index behaves like a loaded one
+INDEX_DTYPES = {"player_key": int, "season": str, "player_id": int, "code": float, "name": object,
+                "name_key": str, "team": str, "position": int, "match": str, "score": float}
+
+# Minimum score for a fuzzy match: the cosine similarity of the names'
+# character trigrams, plus TEAM_BONUS when the player stays at the same club
+FUZZY_THRESHOLD = 0.65
+TEAM_BONUS = 0.15
+
+
+def normalise_names(names):
+    # Accents stripped, lower case, punctuation and spacing collapsed, so
+    # "G.Jesus", "G. Jesus" and "g jesus" agree and "Cédric" matches "Cedric"
+    return pd.Series(names, dtype=object).fillna("").str.normalize("NFKD").str.encode("ascii", "ignore") \
+        .str.decode("ascii").str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_matrix(names, vocabulary):
+    # Rows of L2-normalised character trigram indicators. `vocabulary` is a
+    # trigram -> column dict, grown in place so several matrices share columns
+    rows, columns = [], []
+    for row, name in enumerate(names):
+        for trigram in _trigrams(name):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(trigram, len(vocabulary)))
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(names), len(vocabulary)))
+    norms = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+    return sparse.diags(1 / np.maximum(norms, 1)) @ matrix
+
+
+def name_similarity(queries, candidates):
+    # Cosine similarity of every query name to every candidate name, in one
+    # sparse matrix product
+    vocabulary = {}
+    query_matrix = trigram_matrix(queries, vocabulary)
+    candidate_matrix = trigram_matrix(candidates, vocabulary)
+    query_matrix.resize(query_matrix.shape[0], len(vocabulary))
+    return (query_matrix @ candidate_matrix.T).toarray()
+
+
+def load_index(path=INDEX_FILE):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS).astype(INDEX_DTYPES)
+    return pd.read_csv(path, dtype={"season": str})
+
+
+def save_index(index_df, path=INDEX_FILE):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    index_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _season_rows(players_df, season):
+    # A player frame (the Name/Team/Position columns of the player data CSVs,
+    # plus bootstrap-static's persistent "code" when present) as index rows
+    rows = pd.DataFrame({
+        "season": season,
+        "player_id": players_df["Player ID"].to_numpy(),
+        "code": players_df["code"].to_numpy() if "code" in players_df else np.nan,
+        "name": players_df["Name"].to_numpy(),
+        "team": players_df["Team"].astype(str).to_numpy(),
+        "position": players_df["Position"].astype(int).to_numpy(),
+    })
+    rows["name_key"] = normalise_names(rows["name"]).to_numpy()
+    return rows
+
+
+def add_season(index_df, players_df, season, threshold=FUZZY_THRESHOLD):
+    # Assign a stable player_key to every player of a new season, in order of
+    # confidence, each known player being claimed at most once:
+    #   1. the persistent bootstrap-static code, when both sides have one
+    #   2. the same normalised name and position, unique on both sides
+    #      (same-club pairs first, which settles most shared surnames)
+    #   3. fuzzy: name trigram similarity plus a same-club bonus, same position
+    #      and no conflicting initials only, best pairs first, above `threshold`
+    # Everyone else is a new arrival and gets a new key. Re-adding a season
+    # (e.g. after mid-season signings) keeps the keys it already assigned and
+    # only matches the players it hasn't seen
+    next_key = int(index_df["player_key"].max()) + 1 if len(index_df) else 1
+    existing = index_df[index_df["season"] == season].set_index("player_id")
+    index_df = index_df[index_df["season"] != season]
+    rows = _season_rows(players_df, season)
+    rows["player_key"], rows["match"], rows["score"] = -1, "new", np.nan
+    kept = rows["player_id"].isin(existing.index).to_numpy()
+    known = index_df.sort_values("season").drop_duplicates("player_key", keep="last") \
+        .astype({"player_key": int, "code": float, "position": int, "team": str, "name_key": str})
+
+    def claim(new_rows, keys, how, scores=1.0):
+        rows.loc[new_rows, ["player_key", "match", "score"]] = pd.DataFrame(
+            {"player_key": keys, "match": how, "score": scores}, index=new_rows)
+
+    def unmatched():
+        return rows[rows["player_key"] < 0], known[~known["player_key"].isin(rows["player_key"])]
+
+    if kept.any():
+        previous = existing.loc[rows.loc[kept, "player_id"]]
+        claim(rows.index[kept], previous["player_key"].to_numpy(), previous["match"].to_numpy(),
+              previous["score"].to_numpy())
+
+    new, old = unmatched()
+    by_code = new.dropna(subset=["code"]).reset_index().merge(old.dropna(subset=["code"]), on="code",
+                                                               suffixes=("", "_old"))
+    claim(by_code["index"].to_numpy(), by_code["player_key_old"].to_numpy(), "code")
+
+    for keys in (["name_key", "position", "team"], ["name_key", "position"]):
+        new, old = unmatched()
+        pairs = new[~new.duplicated(keys, keep=False)].reset_index().merge(
+            old[~old.duplicated(keys, keep=False)], on=keys, suffixes=("", "_old"))
+        claim(pairs["index"].to_numpy(), pairs["player_key_old"].to_numpy(), "exact")
+
+    new, old = unmatched()
+    if len(new) and len(old):
+        scores = name_similarity(new["name_key"].tolist(), old["name_key"].tolist())
+        scores += TEAM_BONUS * (new["team"].to_numpy()[:, None] == old["team"].to_numpy()[None, :])
+        scores[new["position"].to_numpy()[:, None] != old["position"].to_numpy()[None, :]] = 0
+
+        # "R.Williams" is not "B.Williams": different leading initials never match
+        new_initials = new["name_key"].str.extract(r"^([a-z]) ", expand=False).to_numpy(dtype=object)
+        old_initials = old["name_key"].str.extract(r"^([a-z]) ", expand=False).to_numpy(dtype=object)
+        conflict = (new_initials[:, None] != old_initials[None, :]) \
+            & pd.notna(new_initials)[:, None] & pd.notna(old_initials)[None, :]
+        scores[conflict] = 0
+
+        # Greedy one-to-one assignment from the best pair down
+        flat = np.argsort(scores, axis=None)[::-1]
+        flat = flat[scores.ravel()[flat] >= threshold]
+        used_new, used_old, matched = set(), set(), []
+        for i, j in zip(*np.unravel_index(flat, scores.shape)):
+            if i not in used_new and j not in used_old:
+                used_new.add(i)
+                used_old.add(j)
+                matched.append((i, j))
+        if matched:
+            i, j = map(np.array, zip(*matched))
+            claim(new.index[i], old["player_key"].to_numpy()[j], "fuzzy", scores[i, j].round(4))
+
+    arrivals = rows.index[rows["player_key"] < 0]
+    claim(arrivals, np.arange(next_key, next_key + len(arrivals)), "new", np.nan)
+
+    return pd.concat([index_df, rows[INDEX_COLUMNS]], ignore_index=True)
+
+
+def attach_keys(df, season, index_df, id_column="Player ID"):
+    # df with a "Player Key" column for the given season, for joining seasons on
+    # an integer key in one merge
+    keys = index_df.loc[index_df["season"] == season, ["player_id", "player_key"]]
+    keys = pd.Series(keys["player_key"].to_numpy(), index=keys["player_id"].to_numpy())
+    return df.assign(**{"Player Key": keys.reindex(df[id_column].to_numpy()).to_numpy()})
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build the cross-season player identity index")
+    parser.add_argument("--files", nargs="+", default=["player_data_22-23.csv", "player_data_23-24.csv"],
+                        help="Player data CSVs, oldest season first")
+    parser.add_argument("--seasons", nargs="+", default=["22-23", "23-24"], help="Season label of each CSV")
+    parser.add_argument("--index", default=INDEX_FILE, help="Identity index file")
+    args = parser.parse_args()
+
+    index_df = load_index(args.index)
+    frames = {}
+    for path, season in zip(args.files, args.seasons):
+        frames[season] = pd.read_csv(path)
+        start = time.perf_counter()
+        index_df = add_season(index_df, frames[season], season)
+        season_rows = index_df[index_df["season"] == season]
+        print(f"{season}: {len(season_rows)} players indexed in {(time.perf_counter() - start) * 1000:.1f}ms, "
+              f"{season_rows['match'].value_counts().to_dict()}")
+    save_index(index_df, args.index)
+
+    # Two seasons side by side, joined on the stable key
+    if len(frames) >= 2:
+        (old_season, old), (new_season, new) = list(frames.items())[-2:]
+        joined = attach_keys(new, new_season, index_df).merge(
+            attach_keys(old, old_season, index_df), on="Player Key", suffixes=(f" {new_season}", f" {old_season}"))
+        fuzzy = index_df[(index_df["season"] == new_season) & (index_df["match"] == "fuzzy")]
+        print(f"\nFuzzy matches in {new_season}:")
+        print(fuzzy.merge(index_df[index_df["season"] == old_season], on="player_key", suffixes=("", " before"))
+              [["name", "name before", "team", "team before", "score"]].head(20).to_string(index=False))
+        print(f"\n{len(joined)} players in both seasons")
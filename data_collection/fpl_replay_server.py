@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+from fpl_endpoints import ORIGINS, RETRY_STATUSES, RSS_FEED_SOURCES
+
+FIXTURES_DIR = "replay_fixtures"
+PORT = 8770
+
+# NewsAPI query the collectors send; the key is added at record time only
+NEWS_PARAMS = {"q": "Premier League OR Fantasy Football", "language": "en", "sortBy": "publishedAt"}
+
+
+def route_for(url):
+    # Replay route of a live URL: /<service>/<path below the service's origin>.
+    # Query strings are dropped, so replays match whatever parameters are sent
+    for service, origin in ORIGINS.items():
+        if url.startswith(origin):
+            return f"/{service}/{urlsplit(url[len(origin):]).path}"
+    raise ValueError(f"{url} is not below any of {list(ORIGINS.values())}")
+
+
+def replay_urls(port=PORT, host="127.0.0.1"):
+    # Environment that points every collector at a replay server
+    return {
+        "FPL_API_URL": f"http://{host}:{port}/fpl/",
+        "NEWS_API_URL": f"http://{host}:{port}/news/",
+        **{variable: f"http://{host}:{port}/{service}/{path}" for variable, (service, path) in RSS_FEED_SOURCES.items()},
+    }
+
+
+def load_manifest(fixtures_dir=FIXTURES_DIR):
+    with open(os.path.join(fixtures_dir, "manifest.json")) as f:
+        return json.load(f)
+
+
+async def _record_one(session, url, params, fixtures_dir, semaphore, retries=4, backoff=0.5):
+    # Record one response, retrying rate limited and failed requests so a
+    # flaky recording doesn't leave holes in the fixtures
+    for attempt in range(retries + 1):
+        async with semaphore:
+            try:
+                async with session.get(url, params=params) as response:
+                    status, content_type, body = response.status, response.content_type, await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = repr(e)
+        retryable = status in RETRY_STATUSES or isinstance(status, str)
+        if not retryable or attempt == retries:
+            break
+        await asyncio.sleep(backoff * 2 ** attempt)
+
+    if status != 200:
+        logging.error(f"Error recording {url}: {status}")
+        return None
+    name = hashlib.sha256(route_for(url).encode()).hexdigest()[:32]
+    with open(os.path.join(fixtures_dir, "bodies", name), "wb") as f:
+        f.write(body)
+    return route_for(url), {"url": url, "body": name, "content_type": content_type}
+
+
+async def record(fixtures_dir=FIXTURES_DIR, players=None, concurrency=8):
+    # Capture the responses the collectors use: the FPL endpoints (with the
+    # history of every player, or of the first `players`, and the live table
+    # of every finished gameweek), NewsAPI when NEWS_API_KEY is set and every
+    # RSS feed. Recording again merges into the existing manifest
+    os.makedirs(os.path.join(fixtures_dir, "bodies"), exist_ok=True)
+    manifest_path = os.path.join(fixtures_dir, "manifest.json")
+    manifest = load_manifest(fixtures_dir) if os.path.exists(manifest_path) else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    fpl = ORIGINS["fpl"]
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+        requests = [(fpl + path, None) for path in ("bootstrap-static/", "fixtures/", "event-status/")]
+        requests += [(ORIGINS[service] + path, None) for service, path in RSS_FEED_SOURCES.values()]
+        if os.getenv("NEWS_API_KEY"):
+            requests.append((ORIGINS["news"] + "everything", dict(NEWS_PARAMS, apiKey=os.getenv("NEWS_API_KEY"))))
+        results = await asyncio.gather(*(_record_one(session, url, params, fixtures_dir, semaphore)
+                                         for url, params in requests))
+        manifest.update(result for result in results if result)
+
+        bootstrap_route = route_for(fpl + "bootstrap-static/")
+        if bootstrap_route in manifest:
+            with open(os.path.join(fixtures_dir, "bodies", manifest[bootstrap_route]["body"]), "rb") as f:
+                bootstrap = json.load(f)
+            player_ids = [player["id"] for player in bootstrap["elements"]][:players]
+            events = [event["id"] for event in bootstrap["events"] if event["finished"]]
+            urls = [f"{fpl}element-summary/{player_id}/" for player_id in player_ids]
+            urls += [f"{fpl}event/{event}/live/" for event in events]
+            results = await asyncio.gather(*(_record_one(session, url, None, fixtures_dir, semaphore)
+                                             for url in urls))
+            manifest.update(result for result in results if result)
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def make_app(fixtures_dir=FIXTURES_DIR, latency=0.0, jitter=0.0, error_rate=0.0, rate=None, burst=10, seed=0):
+    # Replay server over recorded fixtures. Every response is delayed by
+    # latency +- jitter seconds, fails with a 503 at error_rate, and requests
+    # beyond a token bucket of `rate` per second (with `burst` capacity) get a
+    # 429 with Retry-After. Bodies carry an ETag and honour If-None-Match.
+    # GET /_stats returns the request counts by status
+    manifest = load_manifest(fixtures_dir)
+    bodies = {}
+    for route, entry in manifest.items():
+        with open(os.path.join(fixtures_dir, "bodies", entry["body"]), "rb") as f:
+            body = f.read()
+        bodies[route] = (body, f'"{hashlib.sha256(body).hexdigest()[:16]}"', entry["content_type"])
+
+    rng = random.Random(seed)
+    counts = Counter()
+    bucket = {"tokens": burst, "updated": time.monotonic()}
+
+    def take_token():
+        now = time.monotonic()
+        bucket["tokens"] = min(burst, bucket["tokens"] + (now - bucket["updated"]) * rate)
+        bucket["updated"] = now
+        if bucket["tokens"] >= 1:
+            bucket["tokens"] -= 1
+            return 0
+        return (1 - bucket["tokens"]) / rate
+
+    async def replay(request):
+        if request.path == "/_stats":
+            return web.json_response(dict(counts))
+
+        wait = take_token() if rate else 0
+        if wait:
+            counts[429] += 1
+            return web.Response(status=429, headers={"Retry-After": str(math.ceil(wait))})
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        if rng.random() < error_rate:
+            counts[503] += 1
+            return web.Response(status=503)
+
+        if request.path not in bodies:
+            counts[404] += 1
+            return web.Response(status=404)
+        body, etag, content_type = bodies[request.path]
+        if request.headers.get("If-None-Match") == etag:
+            counts[304] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        counts[200] += 1
+        return web.Response(body=body, content_type=content_type, headers={"ETag": etag})
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", replay)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = ArgumentParser(description="Record the FPL, NewsAPI and RSS responses, or replay them locally")
+    parser.add_argument("mode", choices=["record", "serve"], help="Capture fixtures or serve them")
+    parser.add_argument("--fixtures_dir", default=FIXTURES_DIR, help="Directory of recorded responses")
+    parser.add_argument("--players", type=int, default=None, help="Record the history of only this many players")
+    parser.add_argument("--port", type=int, default=PORT, help="Replay server port")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Random +- seconds on top of the latency")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with a 503")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second before 429s (default: no limit)")
+    parser.add_argument("--burst", type=int, default=10, help="Requests allowed at once above the rate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency jitter and errors")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        manifest = asyncio.run(record(args.fixtures_dir, args.players))
+        print(f"Recorded {len(manifest)} responses in {args.fixtures_dir}")
+    else:
+        print("Point the collectors here with:")
+        print(" ".join(f"{name}={url}" for name, url in replay_urls(args.port).items()))
+        web.run_app(make_app(args.fixtures_dir, args.latency, args.jitter, args.error_rate, args.rate, args.burst,
+                             args.seed), host="127.0.0.1", port=args.port, print=None)
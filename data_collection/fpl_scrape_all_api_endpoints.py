@@ -1,31 +1,144 @@
-import requests
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import date
+
+import aiohttp
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process_focussed"))
+from utils_async import fetch  # noqa: E402
+
+from fpl_endpoints import FPL_API_URL  # noqa: E402
+
 # Base URL for the FPL API
-base_url = "https://fantasy.premierleague.com/api/"
+base_url = FPL_API_URL
 
-# Endpoints as per the provided document
+# Endpoints fetched once per crawl. element-summary/<player_id>/ and
+# event/<event_id>/live/ are expanded from bootstrap-static, and
+# entry/<entry_id>/transfers/ is added when an entry ID is given
 endpoints = {
     "bootstrap_static": "bootstrap-static/",
-    "my_team": "my-team/1487607/",  # replace <team_id> with your actual team ID
-    "player": "element-summary/<player_id>/",  # replace <player_id> with actual player ID
     "fixtures": "fixtures/",
-    "live": "event/<event_id>/live",  # replace <event_id> with actual event ID
-    "transfers": "entry/<entry_id>/transfers",  # replace <entry_id> with actual entry ID
-    # "leagues_classic_standings": "leagues-classic/<league_id>/standings/",  # replace <league_id> with actual league ID
-    # "leagues_h2h_standings": "leagues-h2h/<league_id>/standings/",  # replace <league_id> with actual league ID
-    "event_status": "event-status/"
+    "event_status": "event-status/",
 }
 
-# Create a dictionary to store the data from each endpoint
-data = {}
+# Crawl limits: open connections / requests in flight, request starts per
+# second and retries per request
+MAX_CONCURRENCY = 8
+REQUESTS_PER_SECOND = 20
+RETRIES = 4
+
+
+def rate_limiter(rate):
+    # Spaces request starts at least 1 / rate seconds apart across all tasks
+    lock = asyncio.Lock()
+    next_slot = 0.0
+
+    async def wait():
+        nonlocal next_slot
+        async with lock:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, next_slot)
+            next_slot = slot + 1 / rate
+        await asyncio.sleep(slot - now)
+
+    return wait
+
+
+async def crawl(session, api_url, paths, raw_dir, semaphore, throttle, retries=RETRIES):
+    # Fetch name -> path endpoints concurrently. Each response is saved to
+    # <raw_dir>/<name>.json as it lands, and names already saved there are
+    # read back instead of fetched, so an interrupted crawl resumes where it stopped
+    done = 0
+
+    async def fetch_one(name, path):
+        nonlocal done
+        raw_file = os.path.join(raw_dir, f"{name}.json")
+        if os.path.exists(raw_file):
+            with open(raw_file) as f:
+                return name, json.load(f)
+
+        async with semaphore:
+            await throttle()
+            data = await fetch(session, api_url + path, retries=retries)
+        if data is not None:
+            with open(f"{raw_file}.tmp", "w") as f:
+                json.dump(data, f)
+            os.replace(f"{raw_file}.tmp", raw_file)
+
+        done += 1
+        if done % 100 == 0:
+            logging.info(f"Fetched {done} of {len(paths)} endpoints")
+        return name, data
+
+    return dict(await asyncio.gather(*(fetch_one(name, path) for name, path in paths.items())))
+
+
+async def main(args):
+    os.makedirs(args.raw_dir, exist_ok=True)
+    connector = aiohttp.TCPConnector(limit=args.concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=60)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    throttle = rate_limiter(args.rate)
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        static_paths = dict(endpoints)
+        if args.entry_id:
+            static_paths["transfers"] = f"entry/{args.entry_id}/transfers/"
+        data = await crawl(session, args.base_url, static_paths, args.raw_dir, semaphore, throttle, args.retries)
+        if data["bootstrap_static"] is None:
+            raise Exception("Failed to retrieve bootstrap-static from the API.")
+
+        # Every player's history and the live stats of every finished gameweek
+        player_ids = [player["id"] for player in data["bootstrap_static"]["elements"]]
+        events = [event["id"] for event in data["bootstrap_static"]["events"] if event["finished"]]
+        paths = {f"element_summary_{player_id}": f"element-summary/{player_id}/" for player_id in player_ids}
+        paths.update({f"live_{event}": f"event/{event}/live/" for event in events})
+        data.update(await crawl(session, args.base_url, paths, args.raw_dir, semaphore, throttle, args.retries))
+    elapsed = time.perf_counter() - start
+
+    missing = [name for name, content in data.items() if content is None]
+    logging.info(f"Fetched {len(data) - len(missing)} of {len(data)} endpoints in {elapsed:.1f}s")
+    if missing:
+        logging.warning(f"Failed endpoints (re-run to retry): {', '.join(missing[:10])}")
+
+    # Convert the data to DataFrames and save to CSV files
+    for name in static_paths:
+        if data[name] is None:
+            continue
+        df = pd.json_normalize(data[name])  # flatten the JSON into a DataFrame
+        df.to_csv(os.path.join(args.out_dir, f"{name}.csv"), index=False)
+
+    # Per-gameweek history of every player, and live stats of every finished gameweek
+    history = [pd.DataFrame(data[f"element_summary_{player_id}"]["history"]) for player_id in player_ids
+               if data[f"element_summary_{player_id}"]]
+    if history:
+        pd.concat(history, ignore_index=True).to_csv(
+            os.path.join(args.out_dir, f"player_history_{args.season}.csv"), index=False)
+    live = [pd.json_normalize(data[f"live_{event}"]["elements"]).assign(event=event) for event in events
+            if data[f"live_{event}"]]
+    if live:
+        pd.concat(live, ignore_index=True).to_csv(os.path.join(args.out_dir, f"live_{args.season}.csv"), index=False)
+
 
-# Fetch data from each endpoint
-for name, endpoint in endpoints.items():
-    response = requests.get(base_url + endpoint)
-    data[name] = response.json()
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = ArgumentParser(description="Crawl the FPL API, including every player's history")
+    parser.add_argument("--base_url", default=base_url, help="API base URL (e.g. a local stub server)")
+    parser.add_argument("--out_dir", default=".", help="Directory for the CSV outputs")
+    parser.add_argument("--raw_dir", default=os.path.join("api_raw", date.today().isoformat()),
+                        help="Directory of raw responses; a crawl resumes from what is already here")
+    parser.add_argument("--season", default="23-24", help="Season label of the history outputs")
+    parser.add_argument("--entry_id", type=int, default=None, help="FPL entry ID to fetch transfers for")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Request starts per second")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Retries per request")
+    args = parser.parse_args()
 
-# Convert the data to DataFrames and save to CSV files
-for name, content in data.items():
-    df = pd.json_normalize(content)  # flatten the JSON into a DataFrame
-    df.to_csv(f"{name}.csv", index=False)
+    asyncio.run(main(args))
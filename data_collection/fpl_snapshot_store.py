@@ -0,0 +1,256 @@
+import os
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from fpl_bootstrap_parser import parse_players
+from fpl_http_cache import get_bootstrap_static
+
+SNAPSHOT_DIR = "snapshots"
+
+# A full copy of the player frame is written every this many snapshots, so
+# rebuilding any past state replays at most this many deltas
+CHECKPOINT_EVERY = 24
+
+KEY = "Player ID"
+
+# Delta rows marking a player who left the frame (e.g. no longer available)
+REMOVED = "Removed"
+
+# Per delta row, the columns whose value changed to null. A null cell
+# otherwise means "unchanged", so these changes need spelling out
+NULLED = "Nulled"
+
+INDEX_COLUMNS = ["snapshot", "taken_at", "changed_players", "changed_cells", "checkpoint"]
+
+
+def _paths(store_dir):
+    return {
+        "index": os.path.join(store_dir, "index.csv"),
+        "latest": os.path.join(store_dir, "latest.arrow"),
+        "deltas": os.path.join(store_dir, "deltas"),
+        "checkpoints": os.path.join(store_dir, "checkpoints"),
+    }
+
+
+def _write_arrow(df, path, metadata=None):
+    # Uncompressed Arrow IPC so reads can memory-map and pick columns, written
+    # atomically so a crashed refresh never leaves a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**table.schema.metadata, **metadata})
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def _read_arrow(path, columns=None):
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def _snapshot_path(directory, snapshot):
+    return os.path.join(directory, f"{snapshot:06d}.arrow")
+
+
+def _latest_snapshot(path):
+    # Snapshot number latest.arrow holds, None when missing or untagged
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return int(metadata[b"snapshot"]) if b"snapshot" in metadata else None
+
+
+def snapshot_index(store_dir=SNAPSHOT_DIR):
+    # One row per recorded snapshot, oldest first
+    path = _paths(store_dir)["index"]
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.read_csv(path, parse_dates=["taken_at"])
+
+
+def diff_snapshots(previous, current):
+    # Row-level delta taking `previous` to `current` (both indexed by KEY).
+    # Changed players keep only their changed cells, the rest are null, and
+    # NULLED lists the cells that changed to null. Columns nobody changed to
+    # a value are dropped. New players carry every field and players who
+    # disappeared get a bare row with REMOVED set
+    common = current.index.intersection(previous.index)
+    changed = pd.DataFrame(False, index=common, columns=current.columns)
+    for column in current.columns:
+        if column not in previous:
+            changed[column] = True
+            continue
+        old = previous[column].reindex(common).to_numpy(dtype=object)
+        new = current[column].reindex(common).to_numpy(dtype=object)
+        changed[column] = (old != new) & ~(pd.isna(old) & pd.isna(new))
+
+    changed_rows = changed.index[changed.any(axis=1)]
+    updates = current.loc[changed_rows].where(changed.loc[changed_rows])
+    added = current.loc[current.index.difference(previous.index)]
+    removed = pd.DataFrame(index=previous.index.difference(current.index).rename(KEY))
+    nulled = (changed & current.loc[common].isna()).loc[changed_rows]
+    nulled = pd.Series([list(current.columns[row]) for row in nulled.to_numpy()], index=changed_rows, dtype=object)
+
+    delta = pd.concat([updates, added, removed])
+    delta[REMOVED] = delta.index.isin(removed.index)
+    delta[NULLED] = nulled.reindex(delta.index).map(lambda columns: columns if isinstance(columns, list) else [])
+    delta = delta.loc[:, delta.notna().any(axis=0) | delta.columns.isin([REMOVED, NULLED])]
+
+    return delta.reset_index()
+
+
+def apply_delta(state, delta):
+    # Inverse of diff_snapshots: bring `state` (indexed by KEY) forward by one delta
+    removed = delta[REMOVED].to_numpy(dtype=bool)
+    state = state.drop(index=delta.loc[removed, KEY])
+    rows = delta.loc[~removed].drop(columns=[REMOVED, NULLED], errors="ignore").set_index(KEY)
+    nulled = delta.loc[~removed].set_index(KEY)[NULLED] if NULLED in delta else pd.Series(dtype=object)
+
+    # Columns that first appear in this delta: existing players take their
+    # values from it, and a column only ever nulled starts out all null
+    nulled_columns = {column for columns in nulled for column in columns}
+    for column in rows.columns.union(sorted(nulled_columns)).difference(state.columns):
+        state[column] = rows[column].reindex(state.index) if column in rows else np.nan
+
+    added = rows.index.difference(state.index)
+    if len(added):
+        state = pd.concat([state, rows.loc[added].reindex(columns=state.columns).astype(state.dtypes.to_dict())])
+    existing = rows.drop(index=added)
+    for column in existing.columns:
+        values = existing[column].dropna()
+        if len(values):
+            state.loc[values.index, column] = values.astype(state[column].dtype)
+    for player, columns in nulled.items():
+        if len(columns):
+            state.loc[player, list(columns)] = None
+
+    return state
+
+
+def record_snapshot(player_df, store_dir=SNAPSHOT_DIR, taken_at=None, checkpoint_every=CHECKPOINT_EVERY):
+    # Append one pull of the player frame to the store as a delta against the
+    # previous pull, plus a checkpoint every `checkpoint_every` snapshots.
+    # Returns the delta that was written
+    paths = _paths(store_dir)
+    os.makedirs(paths["deltas"], exist_ok=True)
+    os.makedirs(paths["checkpoints"], exist_ok=True)
+
+    current = player_df.drop_duplicates(KEY).set_index(KEY)
+    snapshot = len(snapshot_index(store_dir))
+    if not snapshot:
+        delta = diff_snapshots(current.iloc[:0], current)
+    elif _latest_snapshot(paths["latest"]) == snapshot - 1:
+        delta = diff_snapshots(_read_arrow(paths["latest"]).set_index(KEY), current)
+    else:
+        # latest is out of step with the index (a refresh died between the
+        # two), so diff against the last indexed snapshot rebuilt from the log
+        delta = diff_snapshots(load_snapshot(store_dir, snapshot=snapshot - 1).set_index(KEY), current)
+
+    _write_arrow(delta, _snapshot_path(paths["deltas"], snapshot))
+    checkpoint = snapshot % checkpoint_every == 0
+    if checkpoint:
+        _write_arrow(current.reset_index(), _snapshot_path(paths["checkpoints"], snapshot))
+
+    # The index line goes after the delta and checkpoint, so a snapshot only
+    # counts once its files exist
+    taken_at = taken_at or datetime.now(timezone.utc)
+    changed_cells = int(delta.drop(columns=[KEY, REMOVED, NULLED]).notna().to_numpy().sum()
+                        + delta[NULLED].map(len).sum())
+    row = pd.DataFrame([[snapshot, pd.Timestamp(taken_at).isoformat(), len(delta), changed_cells, checkpoint]],
+                       columns=INDEX_COLUMNS)
+    row.to_csv(paths["index"], mode="a", header=not os.path.exists(paths["index"]), index=False)
+
+    # latest is only a cache of the last indexed pull, tagged with its number
+    _write_arrow(current.reset_index(), paths["latest"], {b"snapshot": str(snapshot).encode()})
+
+    return delta
+
+
+def load_snapshot(store_dir=SNAPSHOT_DIR, snapshot=None, at=None):
+    # The player frame as of a snapshot number, or as of the last snapshot
+    # taken at or before `at`, or the latest: the nearest earlier checkpoint
+    # with the deltas since then replayed on top
+    index = snapshot_index(store_dir)
+    if at is not None:
+        at = pd.Timestamp(at)
+        at = at.tz_localize("UTC") if at.tzinfo is None else at.tz_convert("UTC")
+        index = index[index["taken_at"] <= at]
+    elif snapshot is not None:
+        index = index[index["snapshot"] <= snapshot]
+    if index.empty:
+        raise Exception(f"No snapshot in {store_dir} matches the request.")
+
+    paths = _paths(store_dir)
+    target = int(index["snapshot"].iloc[-1])
+    base = int(index.loc[index["checkpoint"], "snapshot"].iloc[-1])
+    state = _read_arrow(_snapshot_path(paths["checkpoints"], base)).set_index(KEY)
+    for number in range(base + 1, target + 1):
+        state = apply_delta(state, _read_arrow(_snapshot_path(paths["deltas"], number)))
+
+    return state.sort_index().reset_index()
+
+
+def field_history(field, store_dir=SNAPSHOT_DIR, players=None):
+    # Every recorded value change of one field (e.g. Cost or Selected By %),
+    # read from the delta log alone: one row per player per snapshot it
+    # changed in, null where it changed to null
+    paths = _paths(store_dir)
+    index = snapshot_index(store_dir)
+    changes = []
+    for snapshot, taken_at in zip(index["snapshot"], index["taken_at"]):
+        path = _snapshot_path(paths["deltas"], snapshot)
+        with pa.memory_map(path) as source:
+            names = pa.ipc.open_file(source).schema.names
+        columns = [column for column in (KEY, field, NULLED) if column in names]
+        if len(columns) < 2:
+            continue
+        delta = _read_arrow(path, columns=columns).reindex(columns=[KEY, field, NULLED])
+        nulled = delta[NULLED].map(lambda nulled: isinstance(nulled, (list, np.ndarray)) and field in nulled)
+        delta = delta.loc[delta[field].notna() | nulled, [KEY, field]]
+        changes.append(delta.assign(snapshot=snapshot, taken_at=taken_at))
+
+    if not changes:
+        return pd.DataFrame(columns=[KEY, field, "snapshot", "taken_at"])
+    history = pd.concat(changes, ignore_index=True)
+    if players is not None:
+        history = history[history[KEY].isin(players)]
+
+    return history.reset_index(drop=True)
+
+
+def store_size(store_dir=SNAPSHOT_DIR):
+    # Bytes on disk of the deltas and checkpoints (latest is only a cache)
+    paths = _paths(store_dir)
+    return sum(os.path.getsize(os.path.join(paths[kind], name))
+               for kind in ("deltas", "checkpoints") for name in os.listdir(paths[kind]))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Record a bootstrap-static pull in the snapshot store and query its history")
+    parser.add_argument("--store_dir", default=SNAPSHOT_DIR, help="Snapshot store directory")
+    parser.add_argument("--field", default="Cost", help="Field whose change history to print")
+    parser.add_argument("--at", default=None, help="Also rebuild the player frame as of this UTC time")
+    args = parser.parse_args()
+
+    player_df = parse_players(get_bootstrap_static())
+    delta = record_snapshot(player_df, args.store_dir)
+    index = snapshot_index(args.store_dir)
+    print(f"Snapshot {index['snapshot'].iloc[-1]}: {len(delta)} players changed "
+          f"({index['changed_cells'].iloc[-1]} cells)")
+    print(f"Store holds {len(index)} snapshots in {store_size(args.store_dir) / 1e6:.2f}MB")
+
+    history = field_history(args.field, args.store_dir)
+    print(f"\n{args.field} changes after the first snapshot:")
+    print(history[history["snapshot"] > index["snapshot"].iloc[0]].tail(20).to_string(index=False))
+
+    if args.at:
+        start = time.perf_counter()
+        state = load_snapshot(args.store_dir, at=args.at)
+        print(f"\nRebuilt {len(state)} players as of {args.at} in {(time.perf_counter() - start) * 1000:.1f}ms")
+        print(state.head())
@@ -0,0 +1,141 @@
+import json
+import os
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+from fpl_feature_store import HISTORY_COLUMNS, clean_history, load_features, seasons as feature_store_seasons
+
+TENSOR_DIR = "tensor_store"
+N_GAMEWEEKS = 38
+
+# Per-game stats held as player x gameweek arrays and how a double gameweek
+# combines its games: counts add up (staying NaN when no game has the stat,
+# like the expected_* stats of older seasons), price and ownership keep the
+# later game
+STAT_AGGREGATION = {
+    "minutes": "sum",
+    "total_points": "sum",
+    "goals_scored": "sum",
+    "assists": "sum",
+    "clean_sheets": "sum",
+    "bonus": "sum",
+    "bps": "sum",
+    "expected_goals": "sum",
+    "expected_assists": "sum",
+    "expected_goal_involvements": "sum",
+    "value": "last",
+    "selected": "last",
+}
+
+
+def _season_dir(season, store_dir=TENSOR_DIR):
+    return os.path.join(store_dir, season)
+
+
+def _save_array(array, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def build_season(history_df, season, store_dir=TENSOR_DIR):
+    # One float32 .npy per stat, rows in the order of the season's sorted
+    # player IDs (players.npy) and columns indexed directly by gameweek
+    # (column 0 unused). Gameweeks a player had no game in are NaN, so blanks
+    # stay distinguishable from zero returns
+    history_df = clean_history(history_df)
+    grouped = history_df.groupby(["element", "round"], sort=True)
+    summed = [stat for stat, how in STAT_AGGREGATION.items() if how == "sum"]
+    last = [stat for stat, how in STAT_AGGREGATION.items() if how == "last"]
+    per_gameweek = pd.concat([grouped[summed].sum(min_count=1), grouped[last].last()], axis=1).reset_index()
+
+    player_ids = np.unique(per_gameweek["element"].to_numpy()).astype(np.int32)
+    rows = np.searchsorted(player_ids, per_gameweek["element"].to_numpy())
+    columns = per_gameweek["round"].to_numpy()
+    n_gameweeks = max(N_GAMEWEEKS, int(columns.max(initial=0)))
+
+    season_dir = _season_dir(season, store_dir)
+    os.makedirs(season_dir, exist_ok=True)
+    for stat in STAT_AGGREGATION:
+        array = np.full((len(player_ids), n_gameweeks + 1), np.nan, dtype=np.float32)
+        array[rows, columns] = per_gameweek[stat].to_numpy(dtype=np.float32)
+        _save_array(array, os.path.join(season_dir, f"{stat}.npy"))
+    _save_array(player_ids, os.path.join(season_dir, "players.npy"))
+
+    # The metadata goes last: a season only counts once all its arrays exist
+    with open(os.path.join(season_dir, "meta.json"), "w") as f:
+        json.dump({"season": season, "players": len(player_ids), "gameweeks": n_gameweeks,
+                   "last_gameweek": int(columns.max(initial=0)), "stats": list(STAT_AGGREGATION)}, f)
+
+    return season_dir
+
+
+def seasons(store_dir=TENSOR_DIR):
+    # Complete seasons held in the store, oldest first
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(name for name in os.listdir(store_dir)
+                  if os.path.exists(os.path.join(store_dir, name, "meta.json")))
+
+
+def season_players(season, store_dir=TENSOR_DIR):
+    # Sorted player IDs of a season; row i of every array of the season is player_ids[i]
+    return np.load(os.path.join(_season_dir(season, store_dir), "players.npy"))
+
+
+def player_rows(season, player_ids, store_dir=TENSOR_DIR):
+    # Array rows of the given player IDs, -1 for players not in the season
+    ids = season_players(season, store_dir)
+    player_ids = np.asarray(player_ids)
+    if len(ids) == 0:
+        return np.full(player_ids.shape, -1)
+    rows = np.minimum(np.searchsorted(ids, player_ids), len(ids) - 1)
+    return np.where(ids[rows] == player_ids, rows, -1)
+
+
+def load_stat(stat, season_labels=None, store_dir=TENSOR_DIR):
+    # season -> read-only memory-mapped player x gameweek array of one stat.
+    # Nothing is read until the arrays are sliced, and then only the pages
+    # touched, so one stat over many seasons costs a fraction of the store
+    return {season: np.load(os.path.join(_season_dir(season, store_dir), f"{stat}.npy"), mmap_mode="r")
+            for season in (season_labels or seasons(store_dir))}
+
+
+def stat_frame(stat, season, gameweeks=None, players=None, store_dir=TENSOR_DIR):
+    # One season's slice of a stat as a players x gameweeks DataFrame
+    array = load_stat(stat, [season], store_dir)[season]
+    player_ids = season_players(season, store_dir)
+    gameweeks = np.arange(1, array.shape[1]) if gameweeks is None else np.asarray(gameweeks)
+    rows = np.arange(len(player_ids)) if players is None else player_rows(season, players, store_dir)
+    rows = rows[rows >= 0]
+    return pd.DataFrame(array[rows[:, None], gameweeks[None, :]], index=pd.Index(player_ids[rows], name="element"),
+                        columns=gameweeks)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build the player x gameweek tensor store and time a multi-season slice")
+    parser.add_argument("--history", nargs="*", default=[], help="Per-gameweek history CSVs, one per season")
+    parser.add_argument("--season", nargs="*", default=[], help="Season label of each history CSV")
+    parser.add_argument("--from_feature_store", action="store_true", help="Also build every feature store season")
+    parser.add_argument("--store_dir", default=TENSOR_DIR, help="Tensor store directory")
+    parser.add_argument("--stat", default="total_points", help="Stat to slice across seasons")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for path, season in zip(args.history, args.season):
+        build_season(pd.read_csv(path), season, args.store_dir)
+    if args.from_feature_store:
+        for season in feature_store_seasons():
+            build_season(load_features(season, columns=list(HISTORY_COLUMNS)), season, args.store_dir)
+    print(f"Built {len(args.history) + args.from_feature_store * len(feature_store_seasons())} seasons "
+          f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    arrays = load_stat(args.stat, store_dir=args.store_dir)
+    season_totals = {season: float(np.nansum(array[:, 1:])) for season, array in arrays.items()}
+    elapsed = time.perf_counter() - start
+    print(f"Summed {args.stat} over {len(arrays)} seasons in {elapsed * 1000:.1f}ms")
+    print(pd.Series(season_totals, name=args.stat).to_string())
@@ -1,22 +1,33 @@
-import requests
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+
 import pandas as pd
-from flask import Flask, render_template, request
+from flask import Flask, Response, render_template, request
 from tabulate import tabulate
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+from fpl_http_cache import get_bootstrap_static  # noqa: E402
+from fpl_live_poller import run_live_poller  # noqa: E402
+
 app = Flask(__name__)
 
-def fetch_data():
-    # Set up the API endpoint URL
-    url = "https://fantasy.premierleague.com/api/bootstrap-static/"
+# One background live poller per gameweek, shared by every stream client.
+# Each client gets its own queue of delta batches
+live_pollers = {}
+live_lock = threading.Lock()
 
-    # Send a GET request to the API endpoint
-    response = requests.get(url)
+# Seconds between SSE keep-alive comments while no deltas arrive
+KEEPALIVE_SECONDS = 15
 
-    # Check if the request was successful (status code 200)
-    if response.status_code == 200:
-        # Parse the response as JSON
-        data = response.json()
+def fetch_data():
+    data = get_bootstrap_static()
 
+    # Check if the request was successful
+    if data is not None:
         # Extract player data from the response
         players = data["elements"]
 
@@ -45,5 +56,80 @@ def index():
 
     return render_template('index.html', table=table)
 
+def start_live_poller(event_id, client):
+    # Attach a client queue to the gameweek's poller, starting one in a daemon
+    # thread unless it's already running. The poller stops once its last
+    # client has gone, and deregisters itself however its thread ends
+    with live_lock:
+        poller = live_pollers.get(event_id)
+        if poller is not None:
+            poller["clients"].append(client)
+            return poller
+        poller = {"clients": [client], "state": {}}
+        live_pollers[event_id] = poller
+
+    def broadcast(deltas):
+        with live_lock:
+            for queued in poller["clients"]:
+                queued.put(deltas)
+
+    def stop():
+        # Checked after every poll; deregisters in the same critical section
+        # so no client can attach to a poller that is about to stop
+        with live_lock:
+            if poller["clients"]:
+                return False
+            if live_pollers.get(event_id) is poller:
+                del live_pollers[event_id]
+            return True
+
+    def run():
+        try:
+            asyncio.run(run_live_poller(event_id, [broadcast], poller["state"], stop=stop))
+        except Exception:
+            app.logger.exception(f"Live poller of gameweek {event_id} failed")
+        finally:
+            # End the streams still attached, so their pages reconnect to a new poller
+            with live_lock:
+                if live_pollers.get(event_id) is poller:
+                    del live_pollers[event_id]
+                for queued in poller["clients"]:
+                    queued.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    return poller
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/live/<int:event_id>')
+def live(event_id):
+    # Server-sent events: the full live table once, then only changed player
+    # stats as the poller sees them, so pages patch rows in place
+    client = queue.Queue()
+    poller = start_live_poller(event_id, client)
+    with live_lock:
+        table = poller["state"].get("table")
+
+    def stream():
+        try:
+            if table is not None:
+                yield sse("snapshot", table.reset_index().to_dict(orient="records"))
+            while True:
+                try:
+                    deltas = client.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                # None: the poller has stopped
+                if deltas is None:
+                    return
+                yield sse("delta", deltas)
+        finally:
+            with live_lock:
+                poller["clients"].remove(client)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,112 @@
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_initial_team_selection import BUDGET, MAX_PER_TEAM, SQUAD_POSITIONS, build_squad_model, solution_vector
+
+
+def synthetic_players(n_players, n_teams=20, seed=0):
+    # Random candidate pool shaped like pre_process_data output, with unique
+    # names so the name-keyed legacy builder can be timed fairly
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(list(SQUAD_POSITIONS), size=n_players, p=[0.1, 0.35, 0.4, 0.15])
+    prices = np.round(rng.uniform(4.0, 13.0, size=n_players) * 2) / 2
+    return pd.DataFrame({
+        "Player ID": np.arange(1, n_players + 1),
+        "Player": [f"Player {i}" for i in range(1, n_players + 1)],
+        "Team": rng.integers(0, n_teams, size=n_players).astype(str),
+        "Position": positions,
+        "Price": prices,
+        "Value": np.round(prices * rng.uniform(5, 25, size=n_players)),
+    })
+
+
+def legacy_build(players_df):
+    # The per-player dict/list construction find_optimal_team used before the
+    # vectorised builder, kept here only for comparison
+    values = players_df.set_index('Player')['Value'].to_dict()
+    prices = players_df.set_index('Player')['Price'].to_dict()
+    gks = players_df.loc[players_df['Position'] == 'Goalkeeper', 'Player'].tolist()
+    defs = players_df.loc[players_df['Position'] == 'Defender', 'Player'].tolist()
+    mfs = players_df.loc[players_df['Position'] == 'Midfielder', 'Player'].tolist()
+    fwds = players_df.loc[players_df['Position'] == 'Forward', 'Player'].tolist()
+    teams_list = players_df['Team'].unique().tolist()
+    team_players_dict = players_df.groupby('Team')['Player'].apply(list).to_dict()
+
+    prob = p.LpProblem("The FPL problem", p.LpMaximize)
+    gk_vars = p.LpVariable.dicts("gk", gks, cat=p.LpBinary)
+    def_vars = p.LpVariable.dicts("df", defs, cat=p.LpBinary)
+    mf_vars = p.LpVariable.dicts("mf", mfs, cat=p.LpBinary)
+    fwds_vars = p.LpVariable.dicts("fwd", fwds, cat=p.LpBinary)
+    all_player_vars = {**gk_vars, **def_vars, **mf_vars, **fwds_vars}
+
+    prob += p.lpSum([values[i]*all_player_vars[i] for i in players_df['Player'].tolist()]), "Value objective"
+    prob += p.lpSum([gk_vars[i] for i in gks]) == SQUAD_POSITIONS["Goalkeeper"], "Number of goalkeepers wanted"
+    prob += p.lpSum([def_vars[i] for i in defs]) == SQUAD_POSITIONS["Defender"], "Number of defenders wanted"
+    prob += p.lpSum([mf_vars[i] for i in mfs]) == SQUAD_POSITIONS["Midfielder"], "Number of midfielders wanted"
+    prob += p.lpSum([fwds_vars[i] for i in fwds]) == SQUAD_POSITIONS["Forward"], "Number of forwards wanted"
+    prob += p.lpSum([prices[i]*all_player_vars[i] for i in players_df['Player'].tolist()]) <= BUDGET, "Price constraint"
+    for team in teams_list:
+        prob += p.lpSum([all_player_vars[i] for i in team_players_dict[team]]) <= MAX_PER_TEAM, \
+            f"Max per {team} constraint"
+
+    return prob, all_player_vars
+
+
+def legacy_extract(prob, players_df, all_player_vars):
+    # The legacy read-back: variable names to player names, then three set_index lookups
+    best_15 = [v.name for v in prob.variables() if v.varValue > 0]
+    inv_player_names = {v.name: k for k, v in all_player_vars.items()}
+    best_15_corrected = [inv_player_names[player] for player in best_15]
+    players_df.set_index('Player').loc[best_15_corrected, 'Position'].tolist()
+    players_df.set_index('Player').loc[best_15_corrected, 'Price'].tolist()
+    players_df.set_index('Player').loc[best_15_corrected, 'Value'].tolist()
+    return best_15_corrected
+
+
+def vectorised_extract(players_df, player_vars):
+    return players_df.loc[solution_vector(player_vars) > 0.5, 'Player'].tolist()
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare the legacy and vectorised MILP model builders")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[600, 5000, 50000], help="Candidate pool sizes")
+    args = parser.parse_args()
+
+    rows = []
+    for n_players in args.sizes:
+        players_df = synthetic_players(n_players)
+
+        # Build both models
+        (legacy_prob, legacy_vars), legacy_build_time = time_call(legacy_build, players_df)
+        (prob, player_vars), build_time = time_call(build_squad_model, players_df)
+
+        # Solve both so the read-back has something to read
+        _, legacy_solve_time = time_call(legacy_prob.solve, p.PULP_CBC_CMD(msg=False))
+        _, solve_time = time_call(prob.solve, p.PULP_CBC_CMD(msg=False))
+
+        legacy_squad, legacy_extract_time = time_call(legacy_extract, legacy_prob, players_df, legacy_vars)
+        squad, extract_time = time_call(vectorised_extract, players_df, player_vars)
+
+        rows.append({
+            "players": n_players,
+            "legacy_build_s": round(legacy_build_time, 3),
+            "vector_build_s": round(build_time, 3),
+            "build_speedup": round(legacy_build_time / build_time, 1),
+            "legacy_extract_s": round(legacy_extract_time, 4),
+            "vector_extract_s": round(extract_time, 4),
+            "legacy_solve_s": round(legacy_solve_time, 3),
+            "vector_solve_s": round(solve_time, 3),
+            "same_objective": round(p.value(legacy_prob.objective), 6) == round(p.value(prob.objective), 6),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
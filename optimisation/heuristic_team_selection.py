@@ -0,0 +1,169 @@
+import time
+from argparse import ArgumentParser
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_candidate_pruning import dominated_mask
+from milp_initial_team_selection import (BUDGET, MAX_PER_TEAM, SQUAD_POSITIONS, build_squad_model, format_result,
+                                         lp_relaxation, pre_process_data, solution_vector)
+
+# Moves must improve the squad by more than this to count
+IMPROVEMENT_TOLERANCE = 1e-9
+
+
+def _greedy_fill(selected, order, prices, position_codes, team_codes, quotas, budget):
+    # Add players in the given order while the squad rules allow, keeping
+    # enough money back to fill the other open slots with the cheapest players
+    cheapest = [np.sort(prices[position_codes == pos]) for pos in range(len(quotas))]
+    position_counts = np.bincount(position_codes[selected], minlength=len(quotas))
+    team_counts = np.bincount(team_codes[selected], minlength=team_codes.max() + 1)
+    spent = prices[selected].sum()
+
+    for j in order:
+        pos = position_codes[j]
+        if selected[j] or position_counts[pos] >= quotas[pos] or team_counts[team_codes[j]] >= MAX_PER_TEAM:
+            continue
+        open_slots = quotas - position_counts
+        open_slots[pos] -= 1
+        reserve = sum(cheapest[q][:open_slots[q]].sum() for q in range(len(quotas)))
+        if spent + prices[j] + reserve > budget + 1e-9:
+            continue
+        selected[j] = True
+        position_counts[pos] += 1
+        team_counts[team_codes[j]] += 1
+        spent += prices[j]
+
+    return selected
+
+
+def _local_search(selected, candidates, prices, values, position_codes, team_codes, budget):
+    # Repeatedly apply the best improving one- or two-player swap within
+    # positions until none is left
+    while True:
+        squad = np.flatnonzero(selected)
+        slack = budget - prices[squad].sum() + 1e-9
+        team_counts = np.bincount(team_codes[squad], minlength=team_codes.max() + 1)
+        pool = {pos: np.flatnonzero(candidates & ~selected & (position_codes == pos))
+                for pos in np.unique(position_codes[squad])}
+        best_gain, best_move = IMPROVEMENT_TOLERANCE, None
+
+        # One-player swaps
+        for a in squad:
+            incoming = pool[position_codes[a]]
+            gain = values[incoming] - values[a]
+            ok = (prices[incoming] - prices[a] <= slack) & \
+                (team_counts[team_codes[incoming]] - (team_codes[incoming] == team_codes[a]) < MAX_PER_TEAM)
+            if ok.any() and gain[ok].max() > best_gain:
+                j = np.argmax(np.where(ok, gain, -np.inf))
+                best_gain, best_move = gain[j], ((a, incoming[j]),)
+
+        # Two-player swaps, which can move money between positions
+        for a, b in combinations(squad, 2):
+            in_a, in_b = pool[position_codes[a]], pool[position_codes[b]]
+            counts = team_counts.copy()
+            counts[team_codes[a]] -= 1
+            counts[team_codes[b]] -= 1
+            same_team = team_codes[in_a][:, None] == team_codes[in_b][None, :]
+            gain = (values[in_a] - values[a])[:, None] + (values[in_b] - values[b])[None, :]
+            ok = ((prices[in_a] - prices[a])[:, None] + (prices[in_b] - prices[b])[None, :] <= slack) & \
+                (counts[team_codes[in_a]][:, None] + 1 + same_team <= MAX_PER_TEAM) & \
+                (counts[team_codes[in_b]][None, :] + 1 + same_team <= MAX_PER_TEAM) & \
+                (in_a[:, None] != in_b[None, :])
+            if ok.any() and gain[ok].max() > best_gain:
+                j_a, j_b = np.unravel_index(np.argmax(np.where(ok, gain, -np.inf)), gain.shape)
+                best_gain, best_move = gain[j_a, j_b], ((a, in_a[j_a]), (b, in_b[j_b]))
+
+        if best_move is None:
+            return selected
+        for out_player, in_player in best_move:
+            selected[out_player], selected[in_player] = False, True
+
+
+def heuristic_team(players_df, budget=BUDGET):
+    # Returns a boolean mask of the selected players and the LP upper bound
+    prices = players_df["Price"].to_numpy(dtype=float)
+    values = players_df["Value"].to_numpy(dtype=float)
+    position_codes = pd.Categorical(players_df["Position"], categories=list(SQUAD_POSITIONS)).codes
+    team_codes = pd.factorize(players_df["Team"])[0]
+    quotas = np.array(list(SQUAD_POSITIONS.values()))
+
+    # The LP relaxation gives the bound and, rounded, a strong starting squad
+    bound, lp_x, _ = lp_relaxation(players_df, budget=budget)
+    if bound is None:
+        return None, None
+    selected = np.zeros(len(players_df), dtype=bool)
+    selected = _greedy_fill(selected, np.lexsort((-values, -lp_x)), prices, position_codes, team_codes, quotas, budget)
+    if selected.sum() < quotas.sum():
+        selected = _greedy_fill(selected, np.argsort(prices), prices, position_codes, team_codes, quotas, budget)
+    if selected.sum() < quotas.sum():
+        return None, bound
+
+    # Dominated players are never needed, so leave them out of the search
+    candidates = ~dominated_mask(players_df)
+    selected = _local_search(selected, candidates, prices, values, position_codes, team_codes, budget)
+
+    return selected, bound
+
+
+def find_heuristic_team(players_df, opt_target, budget=BUDGET):
+    # Same result layout as find_optimal_team, plus the LP bound and the gap to it
+    start = time.perf_counter()
+    selected, bound = heuristic_team(players_df, budget=budget)
+    elapsed = time.perf_counter() - start
+
+    if selected is None:
+        return format_result(players_df, np.zeros(len(players_df), dtype=bool), "Infeasible", opt_target)
+
+    value = players_df["Value"].to_numpy(dtype=float)[selected].sum()
+    gap = (bound - value) / abs(bound) * 100 if bound else 0.0
+    result_df = format_result(players_df, selected, "Heuristic", opt_target)
+    heuristic_stats = pd.DataFrame({
+        'player': ['LP_Bound', 'Gap_%', 'Solve_Time_ms'],
+        'position': [round(bound, 2), round(gap, 3), round(elapsed * 1000, 1)],
+        'type': ['Statistic'] * 3,
+    })
+
+    return pd.concat([result_df, heuristic_stats])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Pick a squad in milliseconds and report its gap to optimal")
+    parser.add_argument("--filename", default="player_data_22-23.csv", help="Player data CSV")
+    parser.add_argument("--opt_targets", nargs="+", default=["Total Points", "ROI", "PpM ROI"], help="Columns to maximise")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, opt_target=None)
+    rows = []
+    for opt_target in args.opt_targets:
+        players_df = player_attributes.assign(
+            Value=player_attributes[opt_target].replace([np.inf, -np.inf], np.nan).fillna(0)
+        )
+
+        start = time.perf_counter()
+        selected, bound = heuristic_team(players_df)
+        heuristic_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prob, player_vars = build_squad_model(players_df)
+        prob.solve(p.PULP_CBC_CMD(msg=False))
+        milp_time = time.perf_counter() - start
+        optimum = players_df["Value"].to_numpy()[solution_vector(player_vars) > 0.5].sum()
+
+        heuristic_value = players_df["Value"].to_numpy()[selected].sum()
+        rows.append({
+            'opt_target': opt_target,
+            'heuristic': round(heuristic_value, 3),
+            'lp_bound': round(bound, 3),
+            'reported_gap_%': round((bound - heuristic_value) / abs(bound) * 100, 3),
+            'milp_optimum': round(optimum, 3),
+            'true_gap_%': round((optimum - heuristic_value) / abs(optimum) * 100, 3),
+            'heuristic_ms': round(heuristic_time * 1000, 1),
+            'milp_ms': round(milp_time * 1000, 1),
+        })
+
+    print(find_heuristic_team(player_attributes.rename(columns={args.opt_targets[0]: "Value"}), args.opt_targets[0]))
+    print()
+    print(pd.DataFrame(rows).to_string(index=False))
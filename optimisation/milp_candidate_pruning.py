@@ -0,0 +1,130 @@
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_initial_team_selection import MAX_PER_TEAM, SQUAD_POSITIONS, build_squad_model, pre_process_data
+from milp_transfer_planner import naive_forecast, plan_transfers
+
+SQUAD_SIZE = sum(SQUAD_POSITIONS.values())
+
+# Bound on the number of dominance rows compared at once, to cap memory on large pools
+CHUNK_CELLS = 20_000_000
+
+
+def dominated_mask(players_df, value_cols=("Value",), max_transfers=0):
+    # Player i is dominated by j when j plays the same position, costs no more
+    # and is worth at least as much in every value column (ties broken by row
+    # order). A squad holding i can swap him for any dominator that isn't in
+    # the squad and whose team isn't full. At most quota - 1 dominators are in
+    # the squad and at most (SQUAD_SIZE - 1) // MAX_PER_TEAM other teams are
+    # full; in a multi-week model each of up to max_transfers transfers can
+    # add one more of each. So once i's dominators span more teams than that,
+    # dropping i never loses the optimum
+    blocked_teams = (SQUAD_SIZE - 1) // MAX_PER_TEAM
+    prices = players_df["Price"].to_numpy(dtype=float)
+    values = players_df[list(value_cols)].to_numpy(dtype=float)
+    team_codes = pd.factorize(players_df["Team"])[0]
+    positions = players_df["Position"].to_numpy()
+
+    dominated = np.zeros(len(players_df), dtype=bool)
+    for position, quota in SQUAD_POSITIONS.items():
+        rows = np.flatnonzero(positions == position)
+        if len(rows) <= quota:
+            continue
+        pos_prices, pos_values = prices[rows], values[rows]
+        team_onehot = np.zeros((len(rows), team_codes.max() + 1))
+        team_onehot[np.arange(len(rows)), team_codes[rows]] = 1
+
+        chunk = max(1, CHUNK_CELLS // (len(rows) * values.shape[1]))
+        for start in range(0, len(rows), chunk):
+            own = slice(start, start + chunk)
+            cheaper_or_equal = pos_prices[None, :] <= pos_prices[own, None]
+            at_least_as_good = (pos_values[None, :, :] >= pos_values[own, None, :]).all(axis=2)
+            strictly_better = (pos_prices[None, :] < pos_prices[own, None]) | \
+                (pos_values[None, :, :] > pos_values[own, None, :]).any(axis=2) | \
+                (np.arange(len(rows))[None, :] < np.arange(len(rows))[own, None])
+            dominators = cheaper_or_equal & at_least_as_good & strictly_better
+
+            # Count distinct teams among each player's dominators
+            dominator_teams = (dominators.astype(float) @ team_onehot > 0).sum(axis=1)
+            dominated[rows[own]] = dominator_teams >= quota + blocked_teams + 2 * max_transfers
+
+    return dominated
+
+
+def prune_dominated_players(players_df, value_cols=("Value",), keep_ids=None, max_transfers=0):
+    # Drop dominated players, always keeping keep_ids (e.g. the current squad).
+    # Multi-week models must cap their transfers at max_transfers to stay exact
+    dominated = dominated_mask(players_df, value_cols, max_transfers)
+    if keep_ids is not None:
+        dominated &= ~players_df["Player ID"].isin(keep_ids).to_numpy()
+
+    return players_df.loc[~dominated]
+
+
+def _solve_squad(players_df):
+    prob, player_vars = build_squad_model(players_df)
+    prob.solve(p.PULP_CBC_CMD(msg=False))
+    return p.value(prob.objective)
+
+
+def _time(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    return result, (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Prune dominated players and compare solve times")
+    parser.add_argument("--filename", default="player_data_23-24.csv", help="Player data CSV")
+    parser.add_argument("--opt_target", default="Total Points", help="Column to maximise")
+    parser.add_argument("--horizon", type=int, default=4, help="Gameweeks in the multi-week comparison")
+    parser.add_argument("--max_transfers", type=int, default=2, help="Transfer cap in the multi-week comparison")
+    parser.add_argument("--repeats", type=int, default=3, help="Solves per timing")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, args.opt_target)
+    player_attributes["Value"] = player_attributes["Value"].fillna(0)
+
+    # Single squad model
+    start = time.perf_counter()
+    pruned = prune_dominated_players(player_attributes)
+    prune_time = time.perf_counter() - start
+    full_value, full_time = _time(lambda: _solve_squad(player_attributes), args.repeats)
+    pruned_value, pruned_time = _time(lambda: _solve_squad(pruned), args.repeats)
+
+    print(f"Squad model: pruned {len(player_attributes) - len(pruned)} of {len(player_attributes)} players "
+          f"in {prune_time * 1000:.1f}ms")
+    print(pruned.groupby("Position").size().to_string())
+    print(f"Solve {full_time:.3f}s -> {pruned_time:.3f}s ({full_time / pruned_time:.1f}x), "
+          f"objective {full_value:.2f} -> {pruned_value:.2f}")
+
+    # Multi-week planner: start from the best ROI squad and knock out its
+    # priciest player, then prune on every gameweek column at once
+    forecast = naive_forecast(player_attributes, list(range(1, args.horizon + 1)))
+    roi_attributes = player_attributes.assign(Value=player_attributes["ROI"])
+    _, _, start_squads = plan_transfers(roi_attributes, naive_forecast(roi_attributes, [0]), [], 100,
+                                        free_transfers=15)
+    current_squad = start_squads[0]
+    injured = player_attributes[player_attributes["Player ID"].isin(current_squad)].sort_values("Price")
+    forecast.loc[injured["Player ID"].iloc[-1]] = 0
+
+    weekly = player_attributes.merge(forecast, left_on="Player ID", right_index=True)
+    pruned_weekly = prune_dominated_players(weekly, value_cols=list(forecast.columns), keep_ids=current_squad,
+                                            max_transfers=args.max_transfers)
+    planner_pruned = player_attributes[player_attributes["Player ID"].isin(pruned_weekly["Player ID"])]
+
+    (_, full_summary, _), full_time = _time(
+        lambda: plan_transfers(player_attributes, forecast, current_squad, 0.0, max_transfers=args.max_transfers), 1)
+    (_, pruned_summary, _), pruned_time = _time(
+        lambda: plan_transfers(planner_pruned, forecast, current_squad, 0.0, max_transfers=args.max_transfers), 1)
+
+    print(f"\n{args.horizon}-week planner: pruned {len(player_attributes) - len(planner_pruned)} of "
+          f"{len(player_attributes)} players")
+    print(f"Solve {full_time:.3f}s -> {pruned_time:.3f}s ({full_time / pruned_time:.1f}x), "
+          f"expected points {full_summary['expected_points'].sum():.2f} -> "
+          f"{pruned_summary['expected_points'].sum():.2f}")
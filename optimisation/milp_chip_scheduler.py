@@ -0,0 +1,333 @@
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_candidate_pruning import prune_dominated_players
+from milp_initial_team_selection import (BUDGET, SQUAD_POSITIONS, add_squad_constraints, pre_process_data,
+                                         solution_vector)
+from milp_lineup_selection import BENCH_WEIGHT, XI_FORMATION, XI_SIZE, add_lineup_constraints, build_lineup_model
+from milp_transfer_planner import HIT_COST, MAX_FREE_TRANSFERS, TRANSFER_TIE_BREAK, naive_forecast, plan_transfers
+
+# Gameweek windows (inclusive) in which each chip can be played once
+CHIP_WINDOWS = {
+    "wildcard": [(1, 19), (20, 38)],
+    "free_hit": [(1, 38)],
+    "bench_boost": [(1, 38)],
+    "triple_captain": [(1, 38)],
+}
+
+# Gameweeks a wildcard squad is judged over when estimating its gain
+WILDCARD_HORIZON = 6
+
+
+def xi_points(points, position_codes):
+    # Best starting XI of a fixed squad for each week. points is a squad x
+    # gameweek array; filling each position's minimum with its best players
+    # and then the remaining places with the best of the rest (up to each
+    # position's maximum) is optimal for this formation structure. Returns
+    # the starters' points, the captain's points and the bench's points
+    mins = np.array([low for low, _ in XI_FORMATION.values()])
+    maxs = np.array([high for _, high in XI_FORMATION.values()])
+    starters = np.zeros(points.shape, dtype=bool)
+
+    for t in range(points.shape[1]):
+        order = np.argsort(-points[:, t], kind="stable")
+        counts = np.zeros(len(mins), dtype=int)
+        for j in order:
+            if counts[position_codes[j]] < mins[position_codes[j]]:
+                starters[j, t] = True
+                counts[position_codes[j]] += 1
+        for j in order:
+            if counts.sum() >= XI_SIZE:
+                break
+            if not starters[j, t] and counts[position_codes[j]] < maxs[position_codes[j]]:
+                starters[j, t] = True
+                counts[position_codes[j]] += 1
+
+    xi = np.where(starters, points, 0).sum(axis=0)
+    captain = np.where(starters, points, -np.inf).max(axis=0)
+    return xi, captain, points.sum(axis=0) - xi
+
+
+def _best_lineup_points(players_df, values, budget):
+    # Starters plus captain of the best squad on one value vector. Pruning
+    # dominated players keeps the optimum, since a dominator can take over any role
+    week_df = prune_dominated_players(players_df.assign(Value=values))
+    prob, *_ = build_lineup_model(week_df, budget=budget, bench_weight=0.0)
+    prob.solve(p.PULP_CBC_CMD(msg=False))
+    return p.value(prob.objective)
+
+
+def estimate_chip_gains(players_df, forecast, budget=BUDGET, bench_weight=BENCH_WEIGHT,
+                        wildcard_horizon=WILDCARD_HORIZON):
+    # Phase one of the decomposition: the points each chip would add in each
+    # gameweek, measured against the squad that is best on the season average
+    gameweeks = list(forecast.columns)
+    points = forecast.reindex(index=players_df["Player ID"].to_numpy(), columns=gameweeks).fillna(0).to_numpy()
+
+    prob, squad_vars, _, _ = build_lineup_model(players_df.assign(Value=points.mean(axis=1)), budget=budget,
+                                                bench_weight=bench_weight)
+    prob.solve(p.PULP_CBC_CMD(msg=False))
+    base = solution_vector(squad_vars) > 0.5
+    base_codes = pd.Categorical(players_df.loc[base, "Position"], categories=list(SQUAD_POSITIONS)).codes
+    xi, captain, bench = xi_points(points[base], base_codes)
+
+    # The wildcard is judged over the weeks after it against the base squad
+    # over the same weeks, with one XI picked on the window's total
+    windows = [slice(t, t + wildcard_horizon) for t in range(len(gameweeks))]
+    window_points = np.stack([points[:, window].sum(axis=1) for window in windows], axis=1)
+    window_xi, window_captain, _ = xi_points(window_points[base], base_codes)
+
+    gains = []
+    for t, gw in enumerate(gameweeks):
+        gains.append({
+            'gameweek': gw,
+            'wildcard': _best_lineup_points(players_df, window_points[:, t], budget)
+            - window_xi[t] - window_captain[t],
+            'free_hit': _best_lineup_points(players_df, points[:, t], budget) - xi[t] - captain[t],
+            'bench_boost': bench[t],
+            'triple_captain': captain[t],
+        })
+
+    return pd.DataFrame(gains).set_index('gameweek').clip(lower=0).round(2)
+
+
+def assign_chips(gains_df, chip_windows=CHIP_WINDOWS):
+    # Play each chip in the window week where it gains most, at most one
+    # chip per gameweek. Returns a gameweek -> chip dict
+    prob = p.LpProblem("The FPL chip problem", p.LpMaximize)
+    chip_vars = {(chip, gw): p.LpVariable(f"{chip}_{gw}", cat=p.LpBinary)
+                 for chip in chip_windows for gw in gains_df.index}
+
+    prob += p.lpSum(gains_df.loc[gw, chip] * v for (chip, gw), v in chip_vars.items()), "Chip gain objective"
+    for chip, windows in chip_windows.items():
+        for first, last in windows:
+            prob += p.lpSum(chip_vars[chip, gw] for gw in gains_df.index if first <= gw <= last) <= 1, \
+                f"One {chip} in gw{first}-{last}"
+    for gw in gains_df.index:
+        prob += p.lpSum(chip_vars[chip, gw] for chip in chip_windows) <= 1, f"One chip in gw{gw}"
+
+    prob.solve(p.PULP_CBC_CMD(msg=False))
+
+    return {gw: chip for (chip, gw), v in chip_vars.items() if round(v.varValue or 0) == 1}
+
+
+def plan_chip_window(players_df, forecast, current_squad, bank, free_transfers=1, chips=None,
+                     hit_cost=HIT_COST, max_free_transfers=MAX_FREE_TRANSFERS, bench_weight=BENCH_WEIGHT,
+                     time_limit=None):
+    # Transfer plan with a starting XI and captain every week, over all the
+    # forecast's gameweek columns, with chips fixed to the given weeks
+    # (gameweek -> chip). A free hit squad is only held for its own week and
+    # a wildcard week's transfers are free and don't use up free transfers
+    chips = chips or {}
+    gameweeks = list(forecast.columns)
+    player_ids = players_df["Player ID"].to_numpy()
+    prices = players_df["Price"].to_numpy()
+    points = forecast.reindex(index=player_ids, columns=gameweeks).fillna(0).to_numpy()
+    in_squad = players_df["Player ID"].isin(current_squad).to_numpy()
+
+    # Create the problem and set it to maximization (we want to maximize points over the horizon)
+    prob = p.LpProblem("The FPL chip plan problem", p.LpMaximize)
+
+    # Buying and selling use the same price, so the funds are fixed for the whole plan
+    funds = round(bank + prices[in_squad].sum(), 1) + 1e-6
+    prev_squad, prev_ft = in_squad.astype(int), free_transfers
+    squad_vars, play_vars, starter_vars, captain_vars, hit_vars, ft_vars = {}, {}, {}, {}, {}, {}
+    objective = []
+    for t, gw in enumerate(gameweeks):
+        chip = chips.get(gw)
+        x = [p.LpVariable(f"x_{pid}_{gw}", cat=p.LpBinary) for pid in player_ids]
+        buy = [p.LpVariable(f"buy_{pid}_{gw}", lowBound=0, upBound=1) for pid in player_ids]
+        used = p.LpVariable(f"free_used_{gw}", lowBound=0, cat=p.LpInteger)
+        hits = p.LpVariable(f"hits_{gw}", lowBound=0, cat=p.LpInteger)
+
+        # A player is bought when he is in this week's squad but not last week's
+        for i in range(len(player_ids)):
+            prob += buy[i] >= x[i] - prev_squad[i], f"Buy {player_ids[i]} gw{gw}"
+        add_squad_constraints(prob, players_df, x, budget=funds, name=f" gw{gw}")
+
+        # The free hit squad is picked on its own and the kept squad is frozen
+        play = x
+        if chip == "free_hit":
+            play = [p.LpVariable(f"free_hit_{pid}_{gw}", cat=p.LpBinary) for pid in player_ids]
+            add_squad_constraints(prob, players_df, play, budget=funds, name=f" free hit gw{gw}")
+            prob += p.lpSum(buy) == 0, f"No transfers gw{gw}"
+
+        # Transfers beyond the free ones cost a hit, except on a wildcard
+        transfers = p.lpSum(buy)
+        if chip in ("wildcard", "free_hit"):
+            prob += used == 0, f"Free transfers used gw{gw}"
+        else:
+            prob += used <= prev_ft, f"Free transfers available gw{gw}"
+            prob += used <= transfers, f"Free transfers used gw{gw}"
+            prob += hits >= transfers - used, f"Hits gw{gw}"
+
+        # Unused free transfers roll over up to the cap
+        if t + 1 < len(gameweeks):
+            next_ft = p.LpVariable(f"free_transfers_{gameweeks[t + 1]}", lowBound=1, upBound=max_free_transfers,
+                                   cat=p.LpInteger)
+            prob += next_ft <= prev_ft - used + 1, f"Free transfer roll gw{gw}"
+            ft_vars[gameweeks[t + 1]], prev_ft = next_ft, next_ft
+
+        # Starting XI and captain from the squad that plays this week
+        starters = [p.LpVariable(f"start_{pid}_{gw}", cat=p.LpBinary) for pid in player_ids]
+        captain = [p.LpVariable(f"captain_{pid}_{gw}", cat=p.LpBinary) for pid in player_ids]
+        add_lineup_constraints(prob, players_df, play, starters, captain, name=f" gw{gw}")
+
+        # The bench scores in full on a bench boost and the captain triples on a triple captain
+        bench_coef = points[:, t] * (1.0 if chip == "bench_boost" else bench_weight)
+        objective += [
+            p.LpAffineExpression(zip(starters, points[:, t] - bench_coef)),
+            p.LpAffineExpression(zip(play, bench_coef)),
+            p.LpAffineExpression(zip(captain, points[:, t] * (2 if chip == "triple_captain" else 1))),
+            -hit_cost * hits - TRANSFER_TIE_BREAK * transfers,
+        ]
+
+        squad_vars[gw], play_vars[gw], starter_vars[gw], captain_vars[gw], hit_vars[gw] = \
+            x, play, starters, captain, hits
+        prev_squad = x
+
+    # Create the objective
+    prob.setObjective(p.lpSum(objective))
+
+    # Solve the problem
+    prob.solve(p.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+
+    # Assign the status of the problem
+    status = p.LpStatus[prob.status]
+
+    # Put the squads, transfers and weekly summary into dataframes. Expected
+    # points are real FPL points: the bench only counts on a bench boost
+    prev_fts = [free_transfers] + [ft_vars[gw] for gw in gameweeks[1:]]
+    prev = in_squad
+    squads, transfers, summary = {}, [], []
+    for t, gw in enumerate(gameweeks):
+        chip = chips.get(gw)
+        selected = solution_vector(squad_vars[gw]) > 0.5
+        playing = solution_vector(play_vars[gw]) > 0.5
+        starting = solution_vector(starter_vars[gw]) > 0.5
+        captained = solution_vector(captain_vars[gw]) > 0.5
+        squads[gw] = player_ids[selected].tolist()
+        for action, moved in (("out", prev & ~selected), ("in", selected & ~prev)):
+            for _, row in players_df.loc[moved].iterrows():
+                transfers.append({
+                    'gameweek': gw,
+                    'action': action,
+                    'player_id': row['Player ID'],
+                    'player': row['Player'],
+                    'position': row['Position'],
+                    'price': round(row['Price'], 2),
+                })
+        scoring = playing if chip == "bench_boost" else starting
+        summary.append({
+            'gameweek': gw,
+            'chip': chip or "",
+            'transfers': int((selected & ~prev).sum()),
+            'free_transfers': int(round(p.value(prev_fts[t]))),
+            'hits': int(round(hit_vars[gw].varValue or 0)),
+            'bank': round(funds - prices[selected].sum(), 2),
+            'captain': players_df.loc[captained, 'Player'].iloc[0] if captained.any() else "",
+            'expected_points': round(float(points[scoring, t].sum()
+                                           + points[captained, t].sum() * (2 if chip == "triple_captain" else 1)), 2),
+        })
+        prev = selected
+
+    transfers_df = pd.DataFrame(transfers, columns=['gameweek', 'action', 'player_id', 'player', 'position', 'price'])
+    summary_df = pd.DataFrame(summary)
+    summary_df.attrs['status'] = status
+
+    return transfers_df, summary_df, squads
+
+
+def schedule_chips(players_df, forecast, current_squad, bank, free_transfers=1, horizon=3,
+                   chip_windows=CHIP_WINDOWS, candidates_per_position=20, hit_cost=HIT_COST,
+                   max_free_transfers=MAX_FREE_TRANSFERS, bench_weight=BENCH_WEIGHT, budget=BUDGET,
+                   time_limit=None):
+    # Decomposed season plan. Phase one estimates each chip's gain per week
+    # and fixes the weeks they are played; phase two is a rolling horizon
+    # over the season that re-plans the next `horizon` weeks every gameweek
+    # with those chips in place and commits only the first week
+    gameweeks = list(forecast.columns)
+    gains_df = estimate_chip_gains(players_df, forecast, budget=budget, bench_weight=bench_weight)
+    chips = assign_chips(gains_df, chip_windows)
+
+    committed, weekly = [], []
+    for t, gw in enumerate(gameweeks):
+        window = forecast[gameweeks[t:t + horizon]]
+
+        # Only the best players on the window's forecast (plus the current
+        # squad) are worth considering as transfers
+        window_total = window.reindex(players_df["Player ID"]).fillna(0).sum(axis=1).to_numpy()
+        rank = pd.Series(window_total, index=players_df.index).groupby(players_df["Position"]) \
+            .rank(ascending=False, method="first")
+        candidates = players_df.loc[(rank <= candidates_per_position) | players_df["Player ID"].isin(current_squad)]
+
+        transfers_df, summary_df, squads = plan_chip_window(
+            candidates, window, current_squad, bank, free_transfers,
+            chips={week: chip for week, chip in chips.items() if week in window.columns},
+            hit_cost=hit_cost, max_free_transfers=max_free_transfers, bench_weight=bench_weight,
+            time_limit=time_limit,
+        )
+        committed.append(transfers_df[transfers_df['gameweek'] == gw])
+        weekly.append(summary_df.iloc[[0]])
+
+        # Roll the state forward to the next gameweek; wildcard and free hit
+        # weeks don't use free transfers
+        first_week = summary_df.iloc[0]
+        used = min(int(first_week['transfers']), free_transfers)
+        if first_week['chip'] in ("wildcard", "free_hit"):
+            used = 0
+        free_transfers = min(max(free_transfers - used + 1, 1), max_free_transfers)
+        current_squad, bank = squads[gw], first_week['bank']
+
+    chip_plan = pd.DataFrame(
+        [{'gameweek': gw, 'chip': chip, 'estimated_gain': gains_df.loc[gw, chip]}
+         for gw, chip in sorted(chips.items())],
+        columns=['gameweek', 'chip', 'estimated_gain'],
+    )
+
+    return chip_plan, pd.concat(committed, ignore_index=True), pd.concat(weekly, ignore_index=True)
+
+
+def fixture_swing_forecast(players_df, gameweeks, seed=0, swing=0.4):
+    # Stand-in forecast until a real one exists: the naive even split scaled
+    # by a random per-team, per-gameweek fixture multiplier
+    rng = np.random.default_rng(seed)
+    team_codes, teams = pd.factorize(players_df["Team"])
+    multipliers = rng.uniform(1 - swing, 1 + swing, size=(len(teams), len(gameweeks)))
+    return naive_forecast(players_df, gameweeks) * multipliers[team_codes]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Schedule chips and transfers over a season")
+    parser.add_argument("--filename", default="player_data_23-24.csv", help="Player data CSV")
+    parser.add_argument("--opt_target", default="Total Points", help="Column used to forecast points")
+    parser.add_argument("--weeks", type=int, default=38, help="Number of gameweeks to plan")
+    parser.add_argument("--horizon", type=int, default=3, help="Gameweeks looked ahead in each solve")
+    parser.add_argument("--candidates", type=int, default=20, help="Transfer candidates per position in each solve")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the stand-in fixture forecast")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, args.opt_target)
+    player_attributes["Value"] = player_attributes["Value"].fillna(0)
+    gameweeks = list(range(1, args.weeks + 1))
+    forecast = fixture_swing_forecast(player_attributes, gameweeks, seed=args.seed)
+
+    # Start from the best squad on the first gameweek (an empty squad with 15 free transfers)
+    _, _, start_squads = plan_transfers(player_attributes, forecast[[1]], [], BUDGET, free_transfers=15)
+
+    start = time.perf_counter()
+    chip_plan, transfers_df, weekly_df = schedule_chips(
+        player_attributes, forecast, start_squads[1], BUDGET - player_attributes.loc[
+            player_attributes["Player ID"].isin(start_squads[1]), "Price"].sum(),
+        horizon=args.horizon, candidates_per_position=args.candidates,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(chip_plan)
+    print(weekly_df.to_string(index=False))
+    print(f"\n{args.weeks}-week plan with chips: {weekly_df['expected_points'].sum():.2f} expected points, "
+          f"{len(transfers_df) // 2} transfers, solved in {elapsed:.1f}s")
@@ -1,5 +1,13 @@
+import numpy as np
 import pandas as pd
 import pulp as p
+from scipy import sparse
+from scipy.optimize import linprog
+
+# Squad rules shared by every model built on top of this one
+SQUAD_POSITIONS = {"Goalkeeper": 2, "Defender": 5, "Midfielder": 5, "Forward": 3}
+BUDGET = 100
+MAX_PER_TEAM = 3
 
 
 def pre_process_data(filename="player_data_22-23.csv", opt_target="Total Points"):
@@ -11,95 +19,145 @@ def pre_process_data(filename="player_data_22-23.csv", opt_target="Total Points"
         lambda x: "Goalkeeper" if x == 1 else "Defender" if x == 2 else "Midfielder" if x == 3 else "Forward"
     )
     
-    # Rename the columns for clarity
-    player_attributes.rename(columns={"Name": "Player", "Cost": "Price", "Team": "Team", opt_target: "Value"}, inplace=True)
+    # Rename the columns for clarity (no opt_target keeps every target column as is)
+    columns = {"Name": "Player", "Cost": "Price", "Team": "Team"}
+    if opt_target is not None:
+        columns[opt_target] = "Value"
+    player_attributes.rename(columns=columns, inplace=True)
 
     return player_attributes
 
 
-def find_optimal_team(players_df, opt_target):
-    # Create dictionaries for player values and prices
-    values = players_df.set_index('Player')['Value'].to_dict()
-    prices = players_df.set_index('Player')['Price'].to_dict()
+def squad_incidence(players_df):
+    # Sparse 0/1 matrix with one row per position and per team, and the
+    # right-hand side and sense of the squad constraint each row belongs to
+    positions = list(SQUAD_POSITIONS)
+    position_codes = pd.Categorical(players_df["Position"], categories=positions).codes
+    team_codes, teams = pd.factorize(players_df["Team"])
+    n_players = len(players_df)
+
+    known = position_codes >= 0
+    rows = np.concatenate([position_codes[known], len(positions) + team_codes])
+    cols = np.concatenate([np.arange(n_players)[known], np.arange(n_players)])
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(positions) + len(teams), n_players)
+    )
+
+    labels = [f"Number of {position}s wanted" for position in positions] + \
+        [f"Max per {team} constraint" for team in teams]
+    rhs = np.array([SQUAD_POSITIONS[position] for position in positions] + [MAX_PER_TEAM] * len(teams))
+    senses = [p.LpConstraintEQ] * len(positions) + [p.LpConstraintLE] * len(teams)
+
+    return incidence, labels, rhs, senses
 
-    # Create lists of players per position
-    gks = players_df.loc[players_df['Position'] == 'Goalkeeper', 'Player'].tolist()
-    defs = players_df.loc[players_df['Position'] == 'Defender', 'Player'].tolist()
-    mfs = players_df.loc[players_df['Position'] == 'Midfielder', 'Player'].tolist()
-    fwds = players_df.loc[players_df['Position'] == 'Forward', 'Player'].tolist()
 
-    # Create lists of players per team
-    teams_list = players_df['Team'].unique().tolist()
-    team_players_dict = players_df.groupby('Team')['Player'].apply(list).to_dict()
+def add_squad_constraints(prob, players_df, player_vars, budget=BUDGET, name=""):
+    # player_vars is a list of variables aligned with the rows of players_df
+    incidence, labels, rhs, senses = squad_incidence(players_df)
 
-    # Create the problem and set it to maximization (we want to maximize value)
-    prob = p.LpProblem("The FPL problem", p.LpMaximize)
+    # Position and max players per team constraints, one per incidence row
+    for row, label in enumerate(labels):
+        columns = incidence.indices[incidence.indptr[row]:incidence.indptr[row + 1]]
+        expr = p.LpAffineExpression([(player_vars[j], 1) for j in columns])
+        prob += p.LpConstraint(expr, senses[row], rhs=rhs[row], name=f"{label}{name}")
 
-    # Create the dictionaries to contain the referenced player variables
-    gk_vars = p.LpVariable.dicts("gk", gks, cat=p.LpBinary)
-    def_vars = p.LpVariable.dicts("df", defs, cat=p.LpBinary)
-    mf_vars = p.LpVariable.dicts("mf", mfs, cat=p.LpBinary)
-    fwds_vars = p.LpVariable.dicts("fwd", fwds, cat=p.LpBinary)
-    all_player_vars = {**gk_vars, **def_vars, **mf_vars, **fwds_vars}
+    # Price constraint (multi-week models track the bank instead)
+    if budget is not None:
+        expr = p.LpAffineExpression(zip(player_vars, players_df["Price"].to_numpy()))
+        prob += p.LpConstraint(expr, p.LpConstraintLE, rhs=budget, name=f"Price constraint{name}")
 
-    # Create the objective
-    prob += p.lpSum([values[i]*all_player_vars[i] for i in players_df['Player'].tolist()]), "Value objective"
+
+def build_squad_model(players_df, budget=BUDGET, name="The FPL problem"):
+    # One binary variable per row, named by Player ID so duplicate names can't collide
+    prob = p.LpProblem(name, p.LpMaximize)
+    player_vars = [p.LpVariable(f"x_{pid}", cat=p.LpBinary) for pid in players_df["Player ID"].to_numpy()]
+
+    # Create the objective from the value vector
+    prob += p.LpAffineExpression(zip(player_vars, players_df["Value"].to_numpy())), "Value objective"
 
     # Create the constraints
-    prob += p.lpSum([gk_vars[i] for i in gks]) == 2, "Number of goalkeepers wanted"
-    prob += p.lpSum([def_vars[i] for i in defs]) == 5, "Number of defenders wanted"
-    prob += p.lpSum([mf_vars[i] for i in mfs]) == 5, "Number of midfielders wanted"
-    prob += p.lpSum([fwds_vars[i] for i in fwds]) == 3, "Number of forwards wanted"
-    prob += p.lpSum([prices[i]*all_player_vars[i] for i in players_df['Player'].tolist()]) <= 100, "Price constraint"
-    for team in teams_list:
-        prob += p.lpSum([all_player_vars[i] for i in team_players_dict[team]]) <= 3, f"Max per {team} constraint"
+    add_squad_constraints(prob, players_df, player_vars, budget=budget)
 
-    # Solve the problem
-    prob.solve()
+    return prob, player_vars
+
+
+def solution_vector(player_vars):
+    # Read the solved variable values back as a vector aligned with the players
+    return np.fromiter((v.varValue or 0 for v in player_vars), dtype=float, count=len(player_vars))
 
-    # Assign the status of the problem
-    status = p.LpStatus[prob.status]
 
-    # Put the selected player names to a list
-    best_15 = [v.name for v in prob.variables() if v.varValue > 0]
+def lp_relaxation(players_df, budget=BUDGET):
+    # Solve the LP relaxation in-process with HiGHS. Returns the upper bound,
+    # the fractional solution and each player's reduced cost: no squad that
+    # includes player j can score more than bound - reduced_costs[j]
+    incidence, _, rhs, senses = squad_incidence(players_df)
+    equality = np.array([sense == p.LpConstraintEQ for sense in senses])
+    prices = sparse.csr_matrix(players_df["Price"].to_numpy(dtype=float)[None, :])
 
-    # Put the correct player names to a list
-    inv_player_names = {v.name: k for k, v in all_player_vars.items()}
-    best_15_corrected = [inv_player_names[player] for player in best_15]
+    res = linprog(
+        -players_df["Value"].to_numpy(dtype=float),
+        A_ub=sparse.vstack([incidence[~equality], prices]), b_ub=np.append(rhs[~equality], budget),
+        A_eq=incidence[equality], b_eq=rhs[equality], bounds=(0, 1), method="highs",
+    )
+    if res.status != 0:
+        return None, None, None
 
-    # Assign the total price
-    total_price = sum(prices[player] for player in best_15_corrected)
+    return -res.fun, res.x, res.lower.marginals
 
-    # Assign the player stats
-    best_15_positions = players_df.set_index('Player').loc[best_15_corrected, 'Position'].tolist()
-    best_15_prices = players_df.set_index('Player').loc[best_15_corrected, 'Price'].tolist()
-    best_15_target_values = players_df.set_index('Player').loc[best_15_corrected, 'Value'].tolist()
 
-    # Assign the total value
-    total_value = p.value(prob.objective)
+def format_result(players_df, selected, status, opt_target, roles=None):
+    # selected is a boolean mask over the rows of players_df, roles an
+    # optional array of labels (e.g. Starter/Bench) aligned with it
+    best_15 = players_df.loc[selected].sort_values(["Position", "Player"])
 
     # Create the dataframe to return
     result_df = pd.DataFrame({
-        'player': best_15_corrected,
-        'position': best_15_positions,
-        'price': [round(p, 2) for p in best_15_prices],
-        'target_value': best_15_target_values,
-        'type': ['Player'] * len(best_15_corrected),  # New 'type' column
+        'player': best_15['Player'].tolist(),
+        'position': best_15['Position'].tolist(),
+        'price': best_15['Price'].round(2).tolist(),
+        'target_value': best_15['Value'].tolist(),
+        'type': ['Player'] * len(best_15),  # New 'type' column
     })
+    if roles is not None:
+        result_df.insert(2, 'role', pd.Series(roles, index=players_df.index).loc[best_15.index].tolist())
     total_stats = pd.DataFrame({
         'player': ['Opt_Status', 'Opt_Target', 'Total_Price', 'Total_Target_Value'],
-        'position': [status, opt_target, round(total_price, 2), round(total_value, 2)],
+        'position': [status, opt_target, round(float(best_15['Price'].sum()), 2), round(float(best_15['Value'].sum()), 2)],
         'type': ['Statistic'] * 4,  # New 'type' column
     })
 
     # Concatenate the two dataframes
-    result_df = pd.concat([result_df, total_stats])
+    return pd.concat([result_df, total_stats])
+
+
+def solve_squad(players_df, budget=BUDGET, warm_start_ids=None):
+    # Build the model from the player vectors
+    prob, player_vars = build_squad_model(players_df, budget=budget)
+
+    # Optionally start CBC from a known squad (e.g. a cached solution)
+    if warm_start_ids is not None:
+        start = players_df["Player ID"].isin(warm_start_ids).to_numpy()
+        for v, value in zip(player_vars, start):
+            v.setInitialValue(int(value))
+
+    # Solve the problem
+    prob.solve(p.PULP_CBC_CMD(warmStart=warm_start_ids is not None))
+
+    # Return the status and the selected rows straight from the solution vector
+    return p.LpStatus[prob.status], solution_vector(player_vars) > 0.5
+
+
+def find_optimal_team(players_df, opt_target, budget=BUDGET, warm_start_ids=None):
+    status, selected = solve_squad(players_df, budget=budget, warm_start_ids=warm_start_ids)
+
+    return format_result(players_df, selected, status, opt_target)
 
-    return result_df
 
+if __name__ == "__main__":
+    from solver_cache import cached_find_optimal_team
 
-player_attributes = pre_process_data("player_data_22-23.csv", "Total Points")
-opt_target = "Total Points"
-result_df = find_optimal_team(player_attributes, opt_target)
+    player_attributes = pre_process_data("player_data_22-23.csv", "Total Points")
+    opt_target = "Total Points"
+    result_df = cached_find_optimal_team(player_attributes, opt_target)
 
-print(result_df)
\ No newline at end of file
+    print(result_df)
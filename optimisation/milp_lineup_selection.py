@@ -0,0 +1,121 @@
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_initial_team_selection import (BUDGET, SQUAD_POSITIONS, build_squad_model, find_optimal_team,
+                                         format_result, pre_process_data, solution_vector, squad_incidence)
+
+# Valid starting XI formations: (min, max) starters per position
+XI_FORMATION = {"Goalkeeper": (1, 1), "Defender": (3, 5), "Midfielder": (2, 5), "Forward": (1, 3)}
+XI_SIZE = 11
+
+# Bench players only score when someone in the XI doesn't play
+BENCH_WEIGHT = 0.1
+
+
+def add_lineup_constraints(prob, players_df, squad_vars, starter_vars, captain_vars, name=""):
+    # All variable lists are aligned with the rows of players_df
+    incidence = squad_incidence(players_df)[0]
+
+    # Starters come from the squad and the captain from the starters
+    for i, pid in enumerate(players_df["Player ID"].to_numpy()):
+        prob += starter_vars[i] <= squad_vars[i], f"Starter in squad {pid}{name}"
+        prob += captain_vars[i] <= starter_vars[i], f"Captain starts {pid}{name}"
+    prob += p.lpSum(starter_vars) == XI_SIZE, f"Number of starters wanted{name}"
+    prob += p.lpSum(captain_vars) == 1, f"One captain{name}"
+
+    # Formation constraints, using the position rows of the squad incidence matrix
+    for position, (low, high) in XI_FORMATION.items():
+        row = list(SQUAD_POSITIONS).index(position)
+        columns = incidence.indices[incidence.indptr[row]:incidence.indptr[row + 1]]
+        expr = p.LpAffineExpression([(starter_vars[j], 1) for j in columns])
+        prob += p.LpConstraint(expr, p.LpConstraintGE, rhs=low, name=f"Min starting {position}s{name}")
+        prob += p.LpConstraint(expr, p.LpConstraintLE, rhs=high, name=f"Max starting {position}s{name}")
+
+
+def build_lineup_model(players_df, budget=BUDGET, bench_weight=BENCH_WEIGHT, bench_cost_weight=0.0):
+    # Start from the squad model and add the starter and captain layers on top
+    prob, squad_vars = build_squad_model(players_df, budget=budget)
+    player_ids = players_df["Player ID"].to_numpy()
+    starter_vars = [p.LpVariable(f"start_{pid}", cat=p.LpBinary) for pid in player_ids]
+    captain_vars = [p.LpVariable(f"captain_{pid}", cat=p.LpBinary) for pid in player_ids]
+    add_lineup_constraints(prob, players_df, squad_vars, starter_vars, captain_vars)
+
+    # Starters score in full, the captain twice, and the bench is discounted.
+    # Written in terms of squad and starter variables: the bench is squad - starter
+    values = players_df["Value"].to_numpy(dtype=float)
+    prices = players_df["Price"].to_numpy(dtype=float)
+    bench_coef = bench_weight * values - bench_cost_weight * prices
+    prob.setObjective(
+        p.LpAffineExpression(zip(starter_vars, values - bench_coef))
+        + p.LpAffineExpression(zip(squad_vars, bench_coef))
+        + p.LpAffineExpression(zip(captain_vars, values))
+    )
+
+    return prob, squad_vars, starter_vars, captain_vars
+
+
+def find_optimal_lineup(players_df, opt_target, budget=BUDGET, bench_weight=BENCH_WEIGHT, bench_cost_weight=0.0):
+    prob, squad_vars, starter_vars, captain_vars = build_lineup_model(
+        players_df, budget=budget, bench_weight=bench_weight, bench_cost_weight=bench_cost_weight
+    )
+    values = players_df["Value"].to_numpy(dtype=float)
+    prices = players_df["Price"].to_numpy(dtype=float)
+
+    # Solve the problem
+    prob.solve(p.PULP_CBC_CMD(msg=False))
+
+    # Assign the status of the problem
+    status = p.LpStatus[prob.status]
+
+    # Label each selected player with his role
+    selected = solution_vector(squad_vars) > 0.5
+    starters = solution_vector(starter_vars) > 0.5
+    captain = solution_vector(captain_vars) > 0.5
+    roles = np.where(captain, "Captain", np.where(starters, "Starter", "Bench"))
+
+    result_df = format_result(players_df, selected, status, opt_target, roles=roles)
+    lineup_stats = pd.DataFrame({
+        'player': ['Formation', 'Lineup_Target_Value', 'Bench_Price'],
+        'position': [
+            "-".join(str(int((starters & (players_df["Position"] == position).to_numpy()).sum()))
+                     for position in list(SQUAD_POSITIONS)[1:]),
+            round(float(values[starters].sum() + values[captain].sum()), 2),
+            round(float(prices[selected & ~starters].sum()), 2),
+        ],
+        'type': ['Statistic'] * 3,
+    })
+
+    return pd.concat([result_df, lineup_stats])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Pick the best squad, starting XI and captain in one solve")
+    parser.add_argument("--filename", default="player_data_22-23.csv", help="Player data CSV")
+    parser.add_argument("--opt_target", default="Total Points", help="Column to maximise")
+    parser.add_argument("--bench_weight", type=float, default=BENCH_WEIGHT, help="Weight of bench player value")
+    parser.add_argument("--bench_cost_weight", type=float, default=0.0, help="Penalty per million spent on the bench")
+    parser.add_argument("--repeats", type=int, default=5, help="Solves per model for the timing comparison")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, args.opt_target)
+    player_attributes["Value"] = player_attributes["Value"].fillna(0)
+
+    result_df = find_optimal_lineup(player_attributes, args.opt_target, bench_weight=args.bench_weight,
+                                    bench_cost_weight=args.bench_cost_weight)
+    print(result_df)
+
+    # Compare solve time against the 15-man squad model on the full pool
+    timings = {}
+    for label, solve in (("Squad only", lambda: find_optimal_team(player_attributes, args.opt_target)),
+                         ("Squad + XI + captain", lambda: find_optimal_lineup(player_attributes, args.opt_target))):
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            solve()
+        timings[label] = (time.perf_counter() - start) / args.repeats
+    print(f"\n{len(player_attributes)} players, mean of {args.repeats} solves:")
+    for label, seconds in timings.items():
+        print(f"{label:<22}{seconds:.3f}s")
@@ -0,0 +1,83 @@
+import os
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_initial_team_selection import build_squad_model, pre_process_data, solution_vector
+
+# Set once per worker by _init_worker so the player data is only sent to each process once
+_players_df = None
+
+
+def _init_worker(players_df):
+    global _players_df
+    _players_df = players_df
+
+
+def _solve_point(task):
+    opt_target, budget = task
+
+    # Point the objective at this target without copying the other columns
+    players_df = _players_df.assign(Value=_players_df[opt_target].replace([np.inf, -np.inf], np.nan).fillna(0))
+    prob, player_vars = build_squad_model(players_df, budget=budget)
+    prob.solve(p.PULP_CBC_CMD(msg=False))
+
+    selected = solution_vector(player_vars) > 0.5
+    return {
+        'opt_target': opt_target,
+        'budget': budget,
+        'status': p.LpStatus[prob.status],
+        'cost': round(float(players_df.loc[selected, 'Price'].sum()), 2),
+        'value': round(float(players_df.loc[selected, 'Value'].sum()), 4),
+        'player_ids': players_df.loc[selected, 'Player ID'].tolist(),
+    }
+
+
+def pareto_frontier(sweep_df):
+    # Keep the points no other point beats on both cost (lower) and value (higher)
+    frontier = []
+    for _, target_df in sweep_df[sweep_df['status'] == 'Optimal'].groupby('opt_target', sort=False):
+        target_df = target_df.sort_values(['cost', 'value'], ascending=[True, False])
+        best_value = target_df['value'].cummax().shift(fill_value=-np.inf)
+        frontier.append(target_df[target_df['value'] > best_value])
+
+    return pd.concat(frontier, ignore_index=True)
+
+
+def budget_sweep(players_df, opt_targets, budgets, max_workers=None):
+    # Solve every (target, budget) pair across a process pool
+    tasks = [(opt_target, budget) for opt_target in opt_targets for budget in budgets]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(players_df,)) as pool:
+        sweep_df = pd.DataFrame(pool.map(_solve_point, tasks))
+
+    return sweep_df, pareto_frontier(sweep_df)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Sweep budgets and objectives and report the cost/value Pareto frontier")
+    parser.add_argument("--filename", default="player_data_22-23.csv", help="Player data CSV")
+    parser.add_argument("--opt_targets", nargs="+", default=["Total Points", "ROI", "PpM ROI"], help="Columns to maximise")
+    parser.add_argument("--min_budget", type=float, default=80.0, help="Smallest budget")
+    parser.add_argument("--max_budget", type=float, default=100.0, help="Largest budget")
+    parser.add_argument("--step", type=float, default=0.5, help="Budget step")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to all cores)")
+    parser.add_argument("--output", default=None, help="Optional CSV file for the frontier")
+    args = parser.parse_args()
+
+    # Read the CSV once and keep every target column
+    player_attributes = pre_process_data(args.filename, opt_target=None)
+    budgets = np.round(np.arange(args.min_budget, args.max_budget + args.step / 2, args.step), 2).tolist()
+
+    start = time.perf_counter()
+    sweep_df, frontier_df = budget_sweep(player_attributes, args.opt_targets, budgets, max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(frontier_df.drop(columns='player_ids').to_string(index=False))
+    print(f"\nSolved {len(sweep_df)} points in {elapsed:.2f}s on {args.workers or os.cpu_count()} workers")
+
+    if args.output:
+        frontier_df.to_csv(args.output, index=False)
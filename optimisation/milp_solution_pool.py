@@ -0,0 +1,110 @@
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_initial_team_selection import (BUDGET, SQUAD_POSITIONS, build_squad_model, format_result,
+                                         lp_relaxation, pre_process_data, solution_vector)
+
+SQUAD_SIZE = sum(SQUAD_POSITIONS.values())
+
+RESULT_COLUMNS = ['rank', 'player', 'position', 'price', 'target_value', 'type']
+
+
+def add_no_good_cut(prob, player_vars, selected, name):
+    # Forbid picking this exact squad again: at most 14 of its 15 players
+    expr = p.LpAffineExpression([(player_vars[j], 1) for j in np.flatnonzero(selected)])
+    prob += p.LpConstraint(expr, p.LpConstraintLE, rhs=SQUAD_SIZE - 1, name=name)
+
+
+def find_top_k_teams(players_df, opt_target, k=20, budget=BUDGET, margin=None):
+    # No squad containing player j can beat bound - reduced_costs[j], so every
+    # squad worth at least bound - margin only uses players that pass that
+    # test. Enumerate on that reduced pool with one model and a no-good cut
+    # after every solve, and widen the margin only if it runs out of squads
+    bound, _, reduced_costs = lp_relaxation(players_df, budget=budget)
+    if bound is None:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    values = players_df["Value"].to_numpy(dtype=float)
+    margin = margin or max(1.0, 0.002 * abs(bound))
+
+    found = []
+    shortfall = 0.0
+    while True:
+        threshold = bound - margin
+        keep = bound - reduced_costs >= threshold - 1e-9
+        keep_rows = np.flatnonzero(keep)
+        prob, player_vars = build_squad_model(players_df.loc[keep], budget=budget)
+        for cut, selected in enumerate(found, start=1):
+            add_no_good_cut(prob, player_vars, selected[keep], f"No good cut {cut}")
+
+        while len(found) < k:
+            prob.solve(p.PULP_CBC_CMD(msg=False))
+            if p.LpStatus[prob.status] != "Optimal":
+                break
+            selected = np.zeros(len(players_df), dtype=bool)
+            selected[keep_rows[solution_vector(player_vars) > 0.5]] = True
+
+            # Below the threshold a pruned player might do better, so widen first
+            if values[selected].sum() < threshold - 1e-9:
+                shortfall = bound - values[selected].sum()
+                break
+            found.append(selected)
+            add_no_good_cut(prob, player_vars, selected[keep], f"No good cut {len(found)}")
+
+        if len(found) == k or keep.all():
+            break
+        margin = max(margin * 4, shortfall)
+
+    # Put the squads into one ranked dataframe
+    results = []
+    for rank, selected in enumerate(found, start=1):
+        result_df = format_result(players_df, selected, "Optimal", opt_target)
+        result_df.insert(0, 'rank', rank)
+        results.append(result_df)
+
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(results)
+
+
+def find_top_k_teams_cold(players_df, opt_target, k=20, budget=BUDGET):
+    # Same squads as find_top_k_teams, but rebuilding the full model for
+    # every solve, for timing comparisons
+    previous = []
+    for rank in range(1, k + 1):
+        prob, player_vars = build_squad_model(players_df, budget=budget)
+        for cut, selected in enumerate(previous, start=1):
+            add_no_good_cut(prob, player_vars, selected, f"No good cut {cut}")
+        prob.solve(p.PULP_CBC_CMD(msg=False))
+        if p.LpStatus[prob.status] != "Optimal":
+            break
+        previous.append(solution_vector(player_vars) > 0.5)
+
+    return previous
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Find the K best distinct FPL squads")
+    parser.add_argument("--filename", default="player_data_22-23.csv", help="Player data CSV")
+    parser.add_argument("--opt_target", default="Total Points", help="Column to maximise")
+    parser.add_argument("--k", type=int, default=20, help="Number of squads to return")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, args.opt_target)
+    player_attributes["Value"] = player_attributes["Value"].fillna(0)
+
+    start = time.perf_counter()
+    top_k_df = find_top_k_teams(player_attributes, args.opt_target, k=args.k)
+    pool_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    find_top_k_teams_cold(player_attributes, args.opt_target, k=args.k)
+    cold_time = time.perf_counter() - start
+
+    print(top_k_df[top_k_df['player'] == 'Total_Target_Value'][['rank', 'position']]
+          .rename(columns={'position': 'total_target_value'}).to_string(index=False))
+    print(f"\n{args.k} squads from one solution pool: {pool_time:.2f}s")
+    print(f"{args.k} cold solves:                  {cold_time:.2f}s")
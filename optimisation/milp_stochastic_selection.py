@@ -0,0 +1,180 @@
+import os
+import sys
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pulp as p
+
+from milp_initial_team_selection import (BUDGET, SQUAD_POSITIONS, build_squad_model, format_result, pre_process_data,
+                                         solution_vector)
+
+# Chance of being available for each FPL status code when no percentage is given
+STATUS_AVAILABILITY = {"a": 1.0, "d": 0.5, "i": 0.0, "s": 0.0, "u": 0.0, "n": 0.0}
+
+# Spread of a player's points around his target when he plays, and the share
+# of that spread driven by a shock common to his whole team
+POINTS_CV = 0.35
+TEAM_CORRELATION = 0.3
+
+
+def availability_probability(players_df):
+    # Prefer the API's chance_of_playing percentage and fall back on the status
+    # code. News-driven availability, when attached, can only lower it: the
+    # API may not have caught up with the news yet, but not the other way round
+    status = players_df["Status"].map(STATUS_AVAILABILITY) if "Status" in players_df else 1.0
+    availability = pd.Series(status, index=players_df.index, dtype=float).fillna(1.0)
+    if "chance_of_playing_next_round" in players_df:
+        availability = (players_df["chance_of_playing_next_round"] / 100).fillna(availability)
+    if "News Availability" in players_df:
+        availability = np.minimum(availability, players_df["News Availability"].fillna(1.0))
+
+    return availability.clip(0, 1).to_numpy()
+
+
+def sample_scenarios(players_df, n_scenarios, batch_size=1000, seed=0, cv=POINTS_CV, team_rho=TEAM_CORRELATION):
+    # Yield scenario x player blocks of sampled points, batch_size scenarios at
+    # a time, so memory stays flat however many scenarios are drawn
+    rng = np.random.default_rng(seed)
+    mu = players_df["Value"].to_numpy(dtype=np.float32)
+    availability = availability_probability(players_df).astype(np.float32)
+    team_codes, teams = pd.factorize(players_df["Team"])
+
+    for start in range(0, n_scenarios, batch_size):
+        size = min(batch_size, n_scenarios - start)
+        team_shock = rng.standard_normal((size, len(teams)), dtype=np.float32)[:, team_codes]
+        own_shock = rng.standard_normal((size, len(mu)), dtype=np.float32)
+        shock = np.sqrt(team_rho) * team_shock + np.sqrt(1 - team_rho) * own_shock
+        plays = rng.random((size, len(mu)), dtype=np.float32) < availability
+        yield plays * np.maximum(mu * (1 + cv * shock), 0)
+
+
+def scenario_moments(players_df, n_scenarios, keep=0, **sample_kwargs):
+    # Stream all scenarios once for the expected points per player, keeping
+    # the first `keep` scenarios in memory for the risk model
+    total = np.zeros(len(players_df))
+    kept = []
+    for batch in sample_scenarios(players_df, n_scenarios, **sample_kwargs):
+        total += batch.sum(axis=0, dtype=np.float64)
+        if sum(len(block) for block in kept) < keep:
+            kept.append(batch)
+
+    return total / n_scenarios, np.concatenate(kept)[:keep] if kept else None
+
+
+def squad_risk(players_df, selected, n_scenarios, alpha=0.9, **sample_kwargs):
+    # Exact expected value and CVaR of a squad over the full scenario set
+    totals = np.concatenate([batch[:, selected].sum(axis=1) for batch in
+                             sample_scenarios(players_df, n_scenarios, **sample_kwargs)])
+    tail = np.sort(totals)[:max(1, int(round((1 - alpha) * n_scenarios)))]
+    return totals.mean(), tail.mean()
+
+
+def risk_score(mean_points, cvar_points, risk_weight):
+    # The CVaR model's objective: mean and CVaR weighted by risk_weight
+    return (1 - risk_weight) * mean_points + risk_weight * cvar_points
+
+
+def _full_mask(players_df, candidates, player_vars):
+    selected = np.zeros(len(players_df), dtype=bool)
+    selected[players_df.index.get_indexer(candidates.index[solution_vector(player_vars) > 0.5])] = True
+    return selected
+
+
+def find_stochastic_team(players_df, opt_target, n_scenarios=10000, risk="expected", alpha=0.9, risk_weight=0.5,
+                         cvar_scenarios=500, candidates_per_position=25, budget=BUDGET, time_limit=30,
+                         **sample_kwargs):
+    # risk="expected" maximises mean points over all scenarios; risk="cvar"
+    # maximises (1 - risk_weight) * mean + risk_weight * CVaR_alpha, the mean
+    # of the worst (1 - alpha) share of scenarios
+    expected, kept = scenario_moments(players_df, n_scenarios, keep=cvar_scenarios if risk == "cvar" else 0,
+                                      **sample_kwargs)
+    candidates = players_df.assign(Value=expected)
+
+    if risk == "cvar":
+        # The risk model adds one constraint per kept scenario, so only the
+        # best candidates by expected points per position take part
+        top = candidates.groupby("Position")["Value"].rank(ascending=False, method="first") \
+            <= candidates_per_position
+        candidate_rows = np.flatnonzero(top.to_numpy())
+        candidates, kept = candidates.iloc[candidate_rows], kept[:, candidate_rows]
+
+    # Start from the deterministic squad constraint set
+    prob, player_vars = build_squad_model(candidates, budget=budget, name="The stochastic FPL problem")
+
+    if risk == "cvar":
+        eta = p.LpVariable("var_threshold")
+        shortfall = [p.LpVariable(f"shortfall_{s}", lowBound=0) for s in range(len(kept))]
+        for s, points in enumerate(kept):
+            prob += p.LpConstraint(
+                p.LpAffineExpression(zip(player_vars, points.astype(float))) + shortfall[s] - eta,
+                p.LpConstraintGE, rhs=0, name=f"Scenario {s} shortfall",
+            )
+        cvar = eta - p.lpSum(shortfall) * (1 / ((1 - alpha) * len(kept)))
+        mean = p.LpAffineExpression(zip(player_vars, candidates["Value"].to_numpy()))
+        prob.setObjective((1 - risk_weight) * mean + risk_weight * cvar)
+
+        # Warm start from the expected value squad so CBC always has an incumbent
+        ev_prob, ev_vars = build_squad_model(candidates, budget=budget)
+        ev_prob.solve(p.PULP_CBC_CMD(msg=False))
+        ev_points = kept @ (solution_vector(ev_vars) > 0.5)
+        ev_eta = np.sort(ev_points)[max(0, int(np.ceil((1 - alpha) * len(kept))) - 1)]
+        for v, ev_v in zip(player_vars, ev_vars):
+            v.setInitialValue(round(ev_v.varValue or 0))
+        eta.setInitialValue(float(ev_eta))
+        for s, points in enumerate(ev_points):
+            shortfall[s].setInitialValue(max(float(ev_eta - points), 0.0))
+
+    # Solve the problem
+    prob.solve(p.PULP_CBC_CMD(msg=False, warmStart=risk == "cvar", timeLimit=time_limit))
+    status, model = p.LpStatus[prob.status], risk
+
+    # Map the solution back onto the full player frame and score it on every scenario
+    selected = _full_mask(players_df, candidates, player_vars)
+    mean_points, cvar_points = squad_risk(players_df, selected, n_scenarios, alpha=alpha, **sample_kwargs)
+
+    if risk == "cvar":
+        # The risk model only sees a subsample of scenarios, so keep the
+        # expected value squad when it scores better on the full set
+        ev_selected = _full_mask(players_df, candidates, ev_vars)
+        ev_mean, ev_cvar = squad_risk(players_df, ev_selected, n_scenarios, alpha=alpha, **sample_kwargs)
+        if risk_score(ev_mean, ev_cvar, risk_weight) > risk_score(mean_points, cvar_points, risk_weight):
+            selected, mean_points, cvar_points = ev_selected, ev_mean, ev_cvar
+            status, model = p.LpStatus[ev_prob.status], "expected"
+
+    # Risk_Measure and Opt_Status both describe the model whose squad was kept
+    result_df = format_result(players_df.assign(Value=expected), selected, status, opt_target)
+    risk_stats = pd.DataFrame({
+        'player': ['Risk_Measure', 'Scenarios', 'Expected_Value', f'CVaR_{alpha:g}'],
+        'position': [model, n_scenarios, round(float(mean_points), 2), round(float(cvar_points), 2)],
+        'type': ['Statistic'] * 4,
+    })
+
+    return pd.concat([result_df, risk_stats])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Pick a squad on sampled points scenarios")
+    parser.add_argument("--filename", default="player_data_23-24.csv", help="Player data CSV")
+    parser.add_argument("--opt_target", default="Total Points", help="Column used as each player's mean")
+    parser.add_argument("--scenarios", type=int, default=10000, help="Number of sampled scenarios")
+    parser.add_argument("--risk", choices=["expected", "cvar"], default="expected", help="Risk measure")
+    parser.add_argument("--alpha", type=float, default=0.9, help="CVaR confidence level")
+    parser.add_argument("--risk_weight", type=float, default=0.5, help="Weight of CVaR against the mean")
+    parser.add_argument("--cvar_scenarios", type=int, default=500, help="Scenarios kept in the CVaR model")
+    parser.add_argument("--time_limit", type=float, default=30, help="Solver time limit in seconds")
+    parser.add_argument("--news_availability", default=None,
+                        help="Availability state from availability_signals.py, applied on top of the status")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, args.opt_target)
+    player_attributes["Value"] = player_attributes["Value"].fillna(0)
+    if args.news_availability:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process_focussed"))
+        from availability_signals import attach_availability, load_state
+        player_attributes = attach_availability(player_attributes, load_state(args.news_availability))
+
+    result_df = find_stochastic_team(player_attributes, args.opt_target, n_scenarios=args.scenarios, risk=args.risk,
+                                     alpha=args.alpha, risk_weight=args.risk_weight,
+                                     cvar_scenarios=args.cvar_scenarios, time_limit=args.time_limit)
+    print(result_df)
@@ -0,0 +1,159 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from argparse import ArgumentParser
+
+import pandas as pd
+
+from milp_initial_team_selection import (BUDGET, MAX_PER_TEAM, SQUAD_POSITIONS, format_result, pre_process_data,
+                                         solve_squad)
+
+CACHE_DIR = ".solver_cache"
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Columns of the candidate data the solution depends on
+KEY_COLUMNS = ["Player ID", "Player", "Team", "Position", "Price", "Value"]
+
+
+def constraint_key(opt_target, budget=BUDGET, model="find_optimal_team"):
+    # Hash of everything except the candidate data: the model, objective and squad rules
+    constraints = {
+        "model": model,
+        "opt_target": opt_target,
+        "budget": float(budget),  # the default 100 and the CLI's 100.0 are one budget
+        "squad_positions": SQUAD_POSITIONS,
+        "max_per_team": MAX_PER_TEAM,
+    }
+    return hashlib.sha256(json.dumps(constraints, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def data_key(players_df):
+    # Hash of the candidate rows, independent of the frame's index
+    row_hashes = pd.util.hash_pandas_object(players_df[KEY_COLUMNS], index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:32]
+
+
+def _entry_path(cache_dir, constraints, data):
+    # Entries are named <constraint key>-<data key> so solutions to the same
+    # model on other data can be found for warm starts
+    return os.path.join(cache_dir, f"{constraints}-{data}.pkl")
+
+
+def _evict(cache_dir, max_bytes):
+    # Drop least recently used entries (oldest modification time) until the
+    # cache fits. Another process may evict the same entries meanwhile
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, "*.pkl")):
+        try:
+            entries.append((os.stat(path), path))
+        except FileNotFoundError:
+            continue
+    total = sum(stat.st_size for stat, _ in entries)
+    for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= stat.st_size
+
+
+def _read_entry(path):
+    # None when the entry was evicted meanwhile or is truncated
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def cache_get(cache_dir, constraints, data):
+    path = _entry_path(cache_dir, constraints, data)
+    entry = _read_entry(path)
+    if entry is None:
+        return None
+
+    # Touch the entry so eviction treats it as recently used
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return entry
+
+
+def cache_put(cache_dir, constraints, data, entry, max_bytes=MAX_CACHE_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(cache_dir, constraints, data)
+
+    # Write to a temporary file first so readers never see a partial entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    _evict(cache_dir, max_bytes)
+
+
+def nearest_entry(cache_dir, constraints):
+    # Most recently used solution of the same model, to warm start from.
+    # Entries evicted or truncated meanwhile are skipped
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, f"{constraints}-*.pkl")):
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    for _, path in sorted(entries, reverse=True):
+        entry = _read_entry(path)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached_find_optimal_team(players_df, opt_target, budget=BUDGET, cache_dir=CACHE_DIR,
+                             max_bytes=MAX_CACHE_BYTES):
+    # Same result as find_optimal_team, served from disk when the candidate
+    # data, objective and constraints have been solved before
+    constraints, data = constraint_key(opt_target, budget), data_key(players_df)
+    entry = cache_get(cache_dir, constraints, data)
+    if entry is not None:
+        return entry["result_df"]
+
+    # On a miss, warm start from the latest solution of the same model
+    nearest = nearest_entry(cache_dir, constraints)
+    warm_start_ids = nearest["player_ids"] if nearest else None
+    status, selected = solve_squad(players_df, budget=budget, warm_start_ids=warm_start_ids)
+    result_df = format_result(players_df, selected, status, opt_target)
+
+    # Only cache solutions that finished
+    if status == "Optimal":
+        cache_put(cache_dir, constraints, data, {
+            "result_df": result_df,
+            "player_ids": players_df.loc[selected, "Player ID"].tolist(),
+        }, max_bytes=max_bytes)
+
+    return result_df
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Solve the squad problem through the on-disk solver cache")
+    parser.add_argument("--filename", default="player_data_22-23.csv", help="Player data CSV")
+    parser.add_argument("--opt_target", default="Total Points", help="Column to maximise")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="Squad budget")
+    parser.add_argument("--cache_dir", default=CACHE_DIR, help="Cache directory")
+    args = parser.parse_args()
+
+    player_attributes = pre_process_data(args.filename, args.opt_target)
+    player_attributes["Value"] = player_attributes["Value"].fillna(0)
+
+    for label in ("First run", "Repeat run"):
+        start = time.perf_counter()
+        result_df = cached_find_optimal_team(player_attributes, args.opt_target, budget=args.budget,
+                                             cache_dir=args.cache_dir)
+        print(f"{label}: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    print(result_df)
@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+from milp_initial_team_selection import SQUAD_POSITIONS, find_optimal_team, pre_process_data
+
+# Rolling windows (in gameweeks) of the form features
+FORM_WINDOWS = (3, 5, 10)
+
+FEATURES = [f"form_{window}" for window in FORM_WINDOWS] + \
+    ["minutes_share", "involvement_rate", "clean_sheet_rate", "season_mean"]
+
+# Per-gameweek stats the features are built from, as named in element-summary/<id>/ history
+HISTORY_STATS = ["total_points", "minutes", "goals_scored", "assists", "clean_sheets"]
+
+# Ridge penalty on the feature weights (the intercept is left unpenalised)
+RIDGE = 1.0
+
+
+def history_matrices(history_df):
+    # One player x gameweek matrix per stat. Double gameweeks are summed and
+    # blank gameweeks are zero
+    rounds = np.arange(1, history_df["round"].max() + 1)
+    wide = history_df.pivot_table(index="element", columns="round", values=HISTORY_STATS, aggfunc="sum")
+    matrices = {stat: wide[stat].reindex(columns=rounds).fillna(0).to_numpy(dtype=float) for stat in HISTORY_STATS}
+    return wide.index.to_numpy(), rounds, matrices
+
+
+def _rolling_mean(matrix, window):
+    # Mean over the `window` gameweeks before each gameweek, from a cumulative
+    # sum along the gameweek axis. Column t covers gameweek t + 1, and the last
+    # column is the gameweek after the history ends
+    cumulative = np.concatenate([np.zeros((len(matrix), 1)), np.cumsum(matrix, axis=1)], axis=1)
+    lagged = np.concatenate([np.zeros((len(matrix), window)), cumulative[:, :-window]], axis=1)[:, :cumulative.shape[1]]
+    seen = np.minimum(np.arange(cumulative.shape[1]), window)
+    return (cumulative - lagged) / np.maximum(seen, 1)
+
+
+def feature_tensor(history_df):
+    # Features x players x gameweeks, built only from earlier gameweeks, for
+    # every gameweek in the history plus the next one. Returns the player ids,
+    # gameweeks, feature tensor and points target (NaN for the next gameweek)
+    player_ids, rounds, m = history_matrices(history_df)
+    involvement = m["goals_scored"] + m["assists"]
+
+    tensor = np.stack(
+        [_rolling_mean(m["total_points"], window) for window in FORM_WINDOWS]
+        + [_rolling_mean(m["minutes"], FORM_WINDOWS[1]) / 90,
+           _rolling_mean(involvement, FORM_WINDOWS[-1]),
+           _rolling_mean(m["clean_sheets"], FORM_WINDOWS[-1]),
+           _rolling_mean(m["total_points"], len(rounds))]
+    )
+    target = np.concatenate([m["total_points"], np.full((len(player_ids), 1), np.nan)], axis=1)
+
+    return player_ids, np.append(rounds, rounds[-1] + 1), tensor, target
+
+
+def _design(tensor, columns):
+    # Rows of (intercept, features) for the given gameweek columns, players first
+    features = tensor[:, :, columns].reshape(len(FEATURES), -1).T
+    return np.hstack([np.ones((len(features), 1)), features])
+
+
+def _position_rows(player_ids, players_df, n_columns):
+    # Position of every (player, gameweek) row of a design matrix
+    positions = players_df.set_index("Player ID")["Position"].reindex(player_ids).to_numpy()
+    return np.repeat(positions, n_columns)
+
+
+def fit_models(history_df, players_df, ridge=RIDGE, first_gameweek=2):
+    # One ridge regression per position, fitted on every (player, gameweek)
+    # from first_gameweek on in a single solve per position. Each model keeps
+    # its regularised Gram matrix for recursive updates
+    player_ids, gameweeks, tensor, target = feature_tensor(history_df)
+    columns = np.flatnonzero((gameweeks >= first_gameweek) & (gameweeks < gameweeks[-1]))
+    X, y = _design(tensor, columns), target[:, columns].ravel()
+    positions = _position_rows(player_ids, players_df, len(columns))
+
+    penalty = ridge * np.eye(X.shape[1])
+    penalty[0, 0] = 0
+    models = {}
+    for position in SQUAD_POSITIONS:
+        rows = positions == position
+        gram = X[rows].T @ X[rows] + penalty + 1e-9 * np.eye(X.shape[1])
+        models[position] = {
+            "coef": np.linalg.solve(gram, X[rows].T @ y[rows]),
+            "gram": gram,
+            "gameweek": int(gameweeks[columns[-1]]),
+        }
+
+    return models
+
+
+def update_models(models, history_df, players_df, forgetting=1.0):
+    # Recursive least squares update with the gameweeks each model hasn't
+    # seen yet, in information form: the Gram matrix absorbs the new rows and
+    # the weights move by one small k x k solve per position, so a weekly
+    # refresh never refits the whole history. forgetting < 1 discounts older gameweeks
+    player_ids, gameweeks, tensor, target = feature_tensor(history_df)
+
+    for position, model in models.items():
+        columns = np.flatnonzero((gameweeks > model["gameweek"]) & (gameweeks < gameweeks[-1]))
+        if not len(columns):
+            continue
+        rows = _position_rows(player_ids, players_df, len(columns)) == position
+        X, y = _design(tensor, columns)[rows], target[:, columns].ravel()[rows]
+
+        model["gram"] = forgetting * model["gram"] + X.T @ X
+        model["coef"] = model["coef"] + np.linalg.solve(model["gram"], X.T @ (y - X @ model["coef"]))
+        model["gameweek"] = int(gameweeks[columns[-1]])
+
+    return models
+
+
+def forecast_points(models, history_df, players_df, gameweeks, scale=None):
+    # Player ID x gameweek frame of expected points, the input the transfer
+    # planner and chip scheduler take. Every future gameweek gets the
+    # prediction from the latest form, times the optional players_df rows x
+    # gameweeks scale (e.g. fixture_scale); players without history get zero
+    player_ids, _, tensor, _ = feature_tensor(history_df)
+    X = _design(tensor, [tensor.shape[2] - 1])
+    positions = _position_rows(player_ids, players_df, 1)
+
+    predicted = np.zeros(len(player_ids))
+    for position, model in models.items():
+        rows = positions == position
+        predicted[rows] = np.maximum(X[rows] @ model["coef"], 0)
+
+    weekly = pd.Series(predicted, index=player_ids).reindex(players_df["Player ID"]).fillna(0).to_numpy()
+    points = np.repeat(weekly[:, None], len(gameweeks), axis=1) if scale is None else weekly[:, None] * scale
+    return pd.DataFrame(points, index=players_df["Player ID"].to_numpy(), columns=list(gameweeks))
+
+
+def forecast_value(players_df, forecast):
+    # Sum the forecast over its gameweeks into the Value column, so
+    # find_optimal_team can pick the best squad for the horizon
+    return players_df.assign(Value=forecast.sum(axis=1).reindex(players_df["Player ID"]).fillna(0).to_numpy())
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Fit per-position points models and forecast the next gameweeks")
+    parser.add_argument("--filename", default="player_data_23-24.csv", help="Player data CSV")
+    parser.add_argument("--history", default="player_history_23-24.csv", help="Per-gameweek player history CSV")
+    parser.add_argument("--season", default=None, help="Read the history from this feature store season instead")
+    parser.add_argument("--fit_until", type=int, default=None, help="Last gameweek of the initial fit")
+    parser.add_argument("--horizon", type=int, default=5, help="Gameweeks to forecast")
+    parser.add_argument("--fixture_matrix", default=None, help="Fixture matrix file to scale the forecast by")
+    args = parser.parse_args()
+
+    # The feature store and fixture matrix live with the collectors
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+
+    player_attributes = pre_process_data(args.filename, "Total Points")
+    if args.season:
+        from fpl_feature_store import load_features
+        history = load_features(args.season, columns=["element", "round"] + HISTORY_STATS)
+    else:
+        history = pd.read_csv(args.history)
+    last_gameweek = int(history["round"].max())
+    fit_until = args.fit_until or last_gameweek - 1
+
+    # Fit on the history up to fit_until, then bring the models up to date one gameweek at a time
+    start = time.perf_counter()
+    models = fit_models(history[history["round"] <= fit_until], player_attributes)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for gw in range(fit_until + 1, last_gameweek + 1):
+        models = update_models(models, history[history["round"] <= gw], player_attributes)
+    update_time = time.perf_counter() - start
+    print(f"Fit to gw{fit_until} in {fit_time * 1000:.1f}ms, "
+          f"updated to gw{last_gameweek} in {update_time * 1000:.1f}ms")
+    for position, model in models.items():
+        print(position, dict(zip(["intercept"] + FEATURES, model["coef"].round(3).tolist())))
+
+    gameweeks = list(range(last_gameweek + 1, last_gameweek + 1 + args.horizon))
+    scale = None
+    if args.fixture_matrix:
+        from fpl_fixture_matrix import fixture_scale, load_fixture_matrix, team_ids
+        matrix = load_fixture_matrix(args.fixture_matrix)
+        scale = fixture_scale(matrix, team_ids(matrix, player_attributes["Team"]), gameweeks)
+    forecast = forecast_points(models, history, player_attributes, gameweeks, scale=scale)
+    print(find_optimal_team(forecast_value(player_attributes, forecast), "Forecast points"))
@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import unicodedata
+from argparse import ArgumentParser
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from name_matcher import build_name_matcher, find_mentions
+from news_dedup import TEXT_FIELDS, find_new_articles, mark_seen
+
+STATE_FILE = "news_availability.csv"
+
+STATE_COLUMNS = ["Player ID", "Name", "Team", "News Availability", "Signal", "Signals", "Evidence", "Updated"]
+
+# Sentence-level rules, first match wins: (signal, pattern, availability the
+# signal points to, weight of one sighting). A return to fitness is checked
+# first so "back from injury" doesn't read as an injury
+SIGNAL_RULES = [
+    ("return", re.compile(r"\b(?:return(?:ed|s|ing)? (?:to (?:\w+ )?training|from injury)|back in (?:\w+ )?training|"
+                          r"back from (?:injury|a knock)|fit again|available again|passed fit|"
+                          r"recovered from|over (?:his|the) (?:injury|knock))\b", re.I), 1.0, 0.8),
+    ("suspension", re.compile(r"\b(?:suspen(?:ded|sion)|banned|ban for|red card|sent off)\b", re.I), 0.0, 1.0),
+    ("injury_out", re.compile(r"\b(?:ruled out|out for (?:the season|(?:\w+ )?(?:weeks|months))|sidelined|surgery|operation|"
+                              r"fractured?|broken|torn|ruptured?|acl|season-ending)\b", re.I), 0.0, 0.9),
+    ("injury_doubt", re.compile(r"\b(?:injur(?:y|ed|ies)|knock|strain|hamstring|groin|calf|ankle|muscle|"
+                                r"doubt(?:ful)?|fitness test|limped off|illness|concussion)\b", re.I), 0.5, 0.6),
+    ("rotation", re.compile(r"\b(?:rotat(?:e|ed|ion)|rested|benched|dropped|omitted|omission|on loan|"
+                            r"leave the club|exit|transfer)\b", re.I), 0.75, 0.5),
+]
+SIGNAL_LEVELS = {signal: (level, weight) for signal, _, level, weight in SIGNAL_RULES}
+
+# A news-driven doubt fades back towards fully available with this half-life
+# unless fresh articles repeat it
+RECOVERY_HALF_LIFE_DAYS = 7.0
+
+# Classifier labels below this probability are ignored
+CLASSIFIER_CONFIDENCE = 0.7
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+# Letters NFKD doesn't decompose into an ASCII base
+_TRANSLITERATE = str.maketrans({"ø": "o", "Ø": "O", "æ": "ae", "Æ": "Ae", "ß": "ss", "đ": "d", "ł": "l", "Ł": "L"})
+
+
+def _strip_accents(name):
+    return unicodedata.normalize("NFKD", name.translate(_TRANSLITERATE)).encode("ascii", "ignore").decode("ascii")
+
+
+def player_aliases(players_df):
+    # alias -> Player IDs it may refer to. Aliases are the FPL name, the name
+    # without its initial ("G.Jesus" -> "Jesus") and accent-free spellings
+    aliases = defaultdict(set)
+    for player_id, name in zip(players_df["Player ID"], players_df["Name"]):
+        if not isinstance(name, str):
+            continue
+        surname = re.sub(r"^\w\.\s*", "", name)
+        for alias in {name, surname, _strip_accents(name), _strip_accents(surname)}:
+            if len(alias) > 2:
+                aliases[alias].add(player_id)
+    return aliases
+
+
+def load_classifier(path):
+    # Optional local sentence classifier: any joblib-saved model with
+    # predict_proba over raw sentences and classes_ among the SIGNAL_RULES
+    # signals (plus a "none" class), e.g. a TF-IDF + logistic regression pipeline
+    if not path or not os.path.exists(path):
+        return None
+    import joblib
+    return joblib.load(path)
+
+
+def _sentence_signal(sentence, classifier=None):
+    # (signal, confidence) of one sentence: the rules first, the classifier
+    # for sentences no rule catches
+    for signal, pattern, _, _ in SIGNAL_RULES:
+        if pattern.search(sentence):
+            return signal, 1.0
+    if classifier is not None:
+        probabilities = classifier.predict_proba([sentence])[0]
+        best = int(np.argmax(probabilities))
+        label = classifier.classes_[best]
+        if label in SIGNAL_LEVELS and probabilities[best] >= CLASSIFIER_CONFIDENCE:
+            return label, float(probabilities[best])
+    return None, 0.0
+
+
+def _article_times(articles_df, now):
+    # Publication time of each article (NewsAPI publishedAt or RSS published),
+    # `now` when missing or unparseable
+    published = articles_df.get("publishedAt", articles_df.get("published"))
+    if published is None:
+        return pd.Series(now, index=articles_df.index)
+    return pd.to_datetime(published, utc=True, errors="coerce", format="mixed").fillna(now)
+
+
+def extract_signals(articles_df, players_df, classifier=None, now=None):
+    # One row per (article, player, signal): a player named in a sentence that
+    # carries a signal. A name several players share only counts when the
+    # article names exactly one of their teams
+    now = now or datetime.now(timezone.utc)
+    aliases = player_aliases(players_df)
+    teams = players_df.set_index("Player ID")["Team"].astype(str)
+    alias_matcher = build_name_matcher(aliases)
+    team_matcher = build_name_matcher(set(teams))
+    alias_by_key = {alias.lower(): alias for alias in aliases}
+
+    columns = [articles_df[field].fillna("").astype(str) for field in TEXT_FIELDS if field in articles_df]
+    if not columns:
+        return pd.DataFrame(columns=["Player ID", "Signal", "Confidence", "Published", "Evidence"])
+    texts = columns[0].str.cat(columns[1:], sep=". ")
+    published = _article_times(articles_df, now)
+    titles = articles_df.get("title", texts)
+
+    rows = []
+    for text, when, title in zip(texts, published, titles):
+        article_teams = set(find_mentions(team_matcher, text))
+        for sentence in _SENTENCE.split(text):
+            # Names must appear capitalised, so "White" the player is not "white"
+            names = [name for name in find_mentions(alias_matcher, sentence)
+                     if alias_by_key[name.lower()] in sentence]
+            if not names:
+                continue
+            signal, confidence = _sentence_signal(sentence, classifier)
+            if signal is None:
+                continue
+            for name in names:
+                candidates = aliases[alias_by_key[name.lower()]]
+                if len(candidates) > 1:
+                    candidates = {player_id for player_id in candidates if teams[player_id] in article_teams}
+                if len(candidates) == 1:
+                    rows.append((next(iter(candidates)), signal, confidence, when, title))
+
+    signals = pd.DataFrame(rows, columns=["Player ID", "Signal", "Confidence", "Published", "Evidence"])
+    # One signal per player per article, the strongest rule first
+    signals["Rank"] = signals["Signal"].map({signal: i for i, (signal, *_) in enumerate(SIGNAL_RULES)})
+    return signals.sort_values(["Rank", "Confidence"], ascending=[True, False]) \
+        .drop_duplicates(["Player ID", "Evidence"]).drop(columns="Rank").sort_values("Published", kind="stable")
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=STATE_COLUMNS)
+    state_df = pd.read_csv(path)
+    state_df["Updated"] = pd.to_datetime(state_df["Updated"], utc=True, format="mixed")
+    return state_df
+
+
+def save_state(state_df, path=STATE_FILE):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    state_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _recover(availability, since, until):
+    # Availability after the doubt has faded for the time between two updates
+    days = max((until - since).total_seconds() / 86400, 0.0)
+    return 1.0 - (1.0 - availability) * 0.5 ** (days / RECOVERY_HALF_LIFE_DAYS)
+
+
+def update_availability(state_df, signals_df, players_df):
+    # Fold new signals into the per-player state in publication order: the
+    # stored availability first recovers for the time since its last update,
+    # then moves towards the signal's level by the signal's weight
+    state = {row["Player ID"]: row for row in state_df.to_dict("records")}
+    players = players_df.set_index("Player ID")
+    for player_id, signal, confidence, published, evidence in signals_df[
+            ["Player ID", "Signal", "Confidence", "Published", "Evidence"]].itertuples(index=False):
+        level, weight = SIGNAL_LEVELS[signal]
+        current = state.get(player_id)
+        if current is None:
+            availability, signals_seen = 1.0, 0
+        else:
+            availability = _recover(current["News Availability"], current["Updated"], published)
+            signals_seen = current["Signals"]
+        availability += weight * confidence * (level - availability)
+        state[player_id] = {
+            "Player ID": player_id,
+            "Name": players.at[player_id, "Name"],
+            "Team": players.at[player_id, "Team"],
+            "News Availability": round(availability, 4),
+            "Signal": signal,
+            "Signals": signals_seen + 1,
+            "Evidence": evidence,
+            "Updated": max(published, current["Updated"]) if current is not None else published,
+        }
+    return pd.DataFrame(list(state.values()), columns=STATE_COLUMNS)
+
+
+def process_new_articles(articles_df, players_df, state_path=STATE_FILE, classifier=None):
+    # One streaming step over articles not processed before (news_dedup's
+    # find_new_articles): their signals and the updated state, saved.
+    # Returns (state, new signals)
+    signals_df = extract_signals(articles_df, players_df, classifier)
+    state_df = update_availability(load_state(state_path), signals_df, players_df)
+    save_state(state_df, state_path)
+    return state_df, signals_df
+
+
+def attach_availability(players_df, state_df, now=None, id_column="Player ID"):
+    # players_df with a "News Availability" column for the optimiser: the
+    # stored probability recovered up to `now`, 1.0 for players with no news
+    now = now or datetime.now(timezone.utc)
+    current = pd.Series([_recover(availability, updated, now) for availability, updated
+                         in zip(state_df["News Availability"], state_df["Updated"])],
+                        index=state_df["Player ID"].to_numpy(), dtype=float)
+    return players_df.assign(**{"News Availability": current.reindex(players_df[id_column].to_numpy())
+                                .fillna(1.0).to_numpy()})
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Update per-player availability from injury, suspension and rotation news")
+    parser.add_argument("--news", nargs="+", default=["filtered_team_news_23-24.csv"],
+                        help="Article CSVs (NewsAPI or RSS); only articles not read before are processed")
+    parser.add_argument("--players", default="player_data.csv", help="Player data CSV with Player ID/Name/Team")
+    parser.add_argument("--state", default=STATE_FILE, help="Per-player availability state")
+    parser.add_argument("--seen_db", default=None,
+                        help="news_dedup seen-store to skip articles already read; every article when omitted")
+    parser.add_argument("--classifier", default=None, help="Optional joblib sentence classifier")
+    args = parser.parse_args()
+
+    players_df = pd.read_csv(args.players)
+    classifier = load_classifier(args.classifier)
+    for path in args.news:
+        articles_df = pd.read_csv(path)
+        start = time.perf_counter()
+        new_df, pending = articles_df, []
+        if args.seen_db:
+            new_df, pending = find_new_articles(articles_df, args.seen_db,
+                                                url_field="url" if "url" in articles_df else "link")
+        state_df, signals_df = process_new_articles(new_df, players_df, args.state, classifier)
+        # Only count the articles as read once the state is saved
+        mark_seen(pending, args.seen_db)
+        print(f"{path}: {len(signals_df)} signals from {len(new_df)} new articles of {len(articles_df)} "
+              f"({(time.perf_counter() - start) * 1000:.1f}ms)")
+        if len(signals_df):
+            print(signals_df.merge(players_df[["Player ID", "Name"]], on="Player ID")
+                  [["Name", "Signal", "Evidence"]].to_string(index=False))
+
+    state_df = load_state(args.state)
+    flagged = attach_availability(players_df, state_df)
+    print(f"\n{len(state_df)} players with news signals, {(flagged['News Availability'] < 1).sum()} still doubtful now. "
+          f"Availability as of each player's latest article:")
+    print(state_df.sort_values("News Availability")[["Name", "Team", "News Availability", "Signal", "Signals",
+                                                     "Updated"]].head(20).to_string(index=False))
@@ -0,0 +1,191 @@
+import hashlib
+import sqlite3
+import time
+import zlib
+from argparse import ArgumentParser
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+SEEN_DB = "news_seen.sqlite"
+
+# Article text fields, whichever a source has (NewsAPI or RSS)
+TEXT_FIELDS = ["title", "description", "content", "summary"]
+
+# MinHash over word 3-grams: NUM_PERM hash functions split into BANDS bands
+# for LSH. Articles sharing any band bucket are compared, and count as the
+# same story when their estimated Jaccard similarity reaches THRESHOLD
+SHINGLE_WORDS = 3
+NUM_PERM = 64
+BANDS = 16
+THRESHOLD = 0.7
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0x5eed)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+
+
+def article_texts(articles_df):
+    # Normalised text of each article: its text fields joined, lower case,
+    # punctuation stripped, so re-published copies hash the same
+    columns = [articles_df[field].fillna("").astype(str) for field in TEXT_FIELDS if field in articles_df]
+    if not columns:
+        return [""] * len(articles_df)
+    text = columns[0].str.cat(columns[1:], sep=" ")
+    return text.str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip().tolist()
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def minhash_signature(text):
+    # NUM_PERM minima of (a * x + b) mod p over the text's shingle hashes
+    words = text.split()
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) % _PRIME for shingle in shingles), dtype=np.uint64)
+    return ((_A * hashes[None, :] + _B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signatures):
+    # One bucket ID per band: a hash of that band's rows of the signature
+    bands = signatures.reshape(len(signatures), BANDS, NUM_PERM // BANDS)
+    return np.array([[zlib.crc32(band.tobytes()) for band in row] for row in bands], dtype=np.int64) \
+        .reshape(len(signatures), BANDS)
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY,
+            content_hash TEXT UNIQUE,
+            url TEXT,
+            title TEXT,
+            first_seen TEXT,
+            signature BLOB
+        );
+        CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket INTEGER, article_id INTEGER);
+        CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket);
+    """)
+    return conn
+
+
+def _seen_candidates(conn, hashes, buckets):
+    # Stored articles with the same content hash, and per batch row the
+    # signatures of stored articles sharing one of its band buckets. Both
+    # in single joins against temporary tables
+    conn.execute("CREATE TEMP TABLE batch_hashes (content_hash TEXT)")
+    conn.execute("CREATE TEMP TABLE batch_bands (row INTEGER, band INTEGER, bucket INTEGER)")
+    conn.executemany("INSERT INTO batch_hashes VALUES (?)", [(h,) for h in hashes])
+    conn.executemany("INSERT INTO batch_bands VALUES (?, ?, ?)",
+                     [(row, band, int(bucket)) for row, row_buckets in enumerate(buckets)
+                      for band, bucket in enumerate(row_buckets)])
+
+    seen_hashes = {h for (h,) in conn.execute(
+        "SELECT content_hash FROM articles JOIN batch_hashes USING (content_hash)")}
+    candidates = defaultdict(list)
+    for row, signature in conn.execute("""
+            SELECT DISTINCT batch_bands.row, articles.signature
+            FROM batch_bands
+            JOIN bands ON bands.band = batch_bands.band AND bands.bucket = batch_bands.bucket
+            JOIN articles ON articles.id = bands.article_id"""):
+        candidates[row].append(np.frombuffer(signature, dtype=np.uint32))
+
+    conn.execute("DROP TABLE batch_hashes")
+    conn.execute("DROP TABLE batch_bands")
+    return seen_hashes, candidates
+
+
+def find_new_articles(articles_df, db_path=SEEN_DB, threshold=THRESHOLD, url_field="url", pending=None):
+    # The articles not seen in any earlier run (or earlier in this batch),
+    # neither verbatim (content hash) nor as a lightly edited copy (MinHash
+    # LSH). Nothing is recorded: returns (new articles, pending), where
+    # pending also holds the new articles of earlier batches passed in as
+    # `pending`, which count as seen here. Record them with mark_seen once
+    # they have been processed
+    pending = list(pending or [])
+    if articles_df.empty:
+        return articles_df, pending
+    texts = article_texts(articles_df)
+    hashes = [content_hash(text) for text in texts]
+    signatures = np.stack([minhash_signature(text) for text in texts])
+    buckets = band_buckets(signatures)
+
+    conn = _connect(db_path)
+    try:
+        seen_hashes, candidates = _seen_candidates(conn, hashes, buckets)
+    finally:
+        conn.close()
+
+    batch_buckets = defaultdict(list)
+    for article in pending:
+        seen_hashes.add(article["content_hash"])
+        for band, bucket in enumerate(article["buckets"]):
+            batch_buckets[band, bucket].append(article["signature"])
+
+    missing = pd.Series(None, index=articles_df.index, dtype=object)
+    urls = articles_df.get(url_field, articles_df.get("link", missing))
+    titles = articles_df.get("title", missing)
+    keep = np.zeros(len(texts), dtype=bool)
+    for row in range(len(texts)):
+        if hashes[row] in seen_hashes:
+            continue
+        similar = candidates[row] + [signature for band, bucket in enumerate(buckets[row])
+                                     for signature in batch_buckets[band, bucket]]
+        if similar and (np.stack(similar) == signatures[row]).mean(axis=1).max() >= threshold:
+            continue
+        keep[row] = True
+        seen_hashes.add(hashes[row])
+        for band, bucket in enumerate(buckets[row]):
+            batch_buckets[band, bucket].append(signatures[row])
+        pending.append({"content_hash": hashes[row], "url": urls.iloc[row], "title": titles.iloc[row],
+                        "signature": signatures[row], "buckets": buckets[row]})
+
+    return articles_df[keep], pending
+
+
+def mark_seen(pending, db_path=SEEN_DB):
+    # Record the pending articles of find_new_articles in the seen-store
+    if not pending:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    conn = _connect(db_path)
+    try:
+        for article in pending:
+            # An article another refresh has stored since is ignored, and so
+            # are its bands, so every band points at the row it was hashed from
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO articles (content_hash, url, title, first_seen, signature) VALUES (?, ?, ?, ?, ?)",
+                (article["content_hash"], article["url"], article["title"], now, article["signature"].tobytes()))
+            if cursor.rowcount:
+                conn.executemany("INSERT INTO bands VALUES (?, ?, ?)", [
+                    (band, int(bucket), cursor.lastrowid) for band, bucket in enumerate(article["buckets"])])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def filter_new_articles(articles_df, db_path=SEEN_DB, threshold=THRESHOLD, url_field="url"):
+    # find_new_articles and mark_seen in one step, for callers with nothing
+    # that can fail in between
+    new_df, pending = find_new_articles(articles_df, db_path, threshold, url_field)
+    mark_seen(pending, db_path)
+    return new_df
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Filter a news CSV down to articles not seen before")
+    parser.add_argument("--news", default="raw_news_data.csv", help="Articles CSV (NewsAPI or RSS)")
+    parser.add_argument("--db", default=SEEN_DB, help="Seen-store database")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Near-duplicate Jaccard threshold")
+    args = parser.parse_args()
+
+    news_df = pd.read_csv(args.news)
+    start = time.perf_counter()
+    new_df = filter_new_articles(news_df, args.db, args.threshold)
+    print(f"{len(new_df)} of {len(news_df)} articles are new ({(time.perf_counter() - start) * 1000:.1f}ms)")
+    print(new_df.head(10)[[column for column in ("title", "source_name") if column in new_df]].to_string())
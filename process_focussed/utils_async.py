@@ -2,53 +2,75 @@ import asyncio
 import aiohttp
 import pandas as pd
 import os
+import sys
 import feedparser
 import logging
 from argparse import ArgumentParser
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection"))
+from fpl_bootstrap_parser import parse_players  # noqa: E402
+from fpl_endpoints import NEWS_API_URL, RETRY_STATUSES, RSS_FEEDS  # noqa: E402
+from fpl_http_cache import cached_fetch_bytes, fetch_bootstrap_static  # noqa: E402
+from fpl_snapshot_store import SNAPSHOT_DIR, record_snapshot  # noqa: E402
+
+from availability_signals import STATE_FILE, process_new_articles  # noqa: E402
+from name_matcher import article_mentions, build_name_matcher, mention_counts  # noqa: E402
+from news_dedup import SEEN_DB, find_new_articles, mark_seen  # noqa: E402
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Asynchronous helper function
-async def fetch(session, url, params=None):
-    async with session.get(url, params=params) as response:
-        if response.status != 200:
-            logging.error(f"Error fetching {url}: {response.status}")
-            return None
-        return await response.json()
+# Feeds younger than this are reused as is; older ones are revalidated with
+# a conditional GET, which costs a bodyless 304 when nothing was published
+RSS_TTL_SECONDS = 60
+
+# Seconds to wait from a Retry-After header, either delay-seconds or an
+# HTTP-date; `default` when it is missing or can't be parsed
+def retry_after_seconds(header, default):
+    if header is None:
+        return default
+    try:
+        return max(float(header), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+# Asynchronous helper function. Rate limited, server and connection errors
+# are retried up to `retries` times with exponential backoff
+async def fetch(session, url, params=None, retries=0, backoff=0.5):
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    return await response.json()
+                if response.status not in RETRY_STATUSES or attempt == retries:
+                    logging.error(f"Error fetching {url}: {response.status}")
+                    return None
+                # Honour the server's Retry-After when it sends one
+                delay = retry_after_seconds(response.headers.get("Retry-After"), backoff * 2 ** attempt)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                logging.error(f"Error fetching {url}: {e!r}")
+                return None
+            delay = backoff * 2 ** attempt
+        await asyncio.sleep(delay)
 
 # FPL data fetching
 async def get_fpl_data():
-    url = "https://fantasy.premierleague.com/api/bootstrap-static/"
     async with aiohttp.ClientSession() as session:
-        data = await fetch(session, url)
+        data = await fetch_bootstrap_static(session)
         if not data:
             raise Exception("Failed to retrieve player data from the API.")
         
-        players = data["elements"]
-        teams = {team['id']: team['name'] for team in data['teams']}
-        
-        player_data = [{
-            "Player ID": player["id"],
-            "Name": player["web_name"],
-            "Team": teams[player["team"]],
-            "Position": player["element_type"],
-            "Cost": player["now_cost"] / 10,
-            "Total Points": player["total_points"],
-            "Minutes": player["minutes"],
-            "Goals Scored": player["goals_scored"],
-            "Assists": player["assists"],
-            "Clean Sheets": player["clean_sheets"],
-            "Selected By %": player["selected_by_percent"],
-            "Status": player["status"],
-        } for player in players]
-
-        player_df = pd.DataFrame(player_data)
-        player_df["ROI"] = player_df["Total Points"] / player_df["Cost"]
-        player_df["Points per Minute"] = player_df["Total Points"] / player_df["Minutes"].replace(0, 1)
-        player_df["PpM ROI"] = player_df["Points per Minute"] * player_df["ROI"]
-        player_df = player_df[player_df["Status"] == "a"]
+        player_df = parse_players(data, available_only=True)
 
         return player_df
 
@@ -58,7 +80,7 @@ async def get_news_data():
     if not news_api_key:
         raise Exception("NewsAPI key not found. Please set the NEWS_API_KEY environment variable.")
 
-    url = "https://newsapi.org/v2/everything"
+    url = NEWS_API_URL + "everything"
     params = {
         "q": "Premier League OR Fantasy Football",
         "language": "en",
@@ -76,63 +98,92 @@ async def get_news_data():
         
         return pd.DataFrame(articles)
 
-# RSS feed fetching
-def fetch_rss_news(rss_url):
-    feed = feedparser.parse(rss_url)
-    return pd.DataFrame(feed.entries)
+# RSS feed fetching. Each feed is fetched through the HTTP cache and parsed
+# in a worker thread, so feedparser never blocks the event loop; a failing
+# feed is logged and skipped rather than sinking the rest
+async def fetch_rss_feed(session, rss_url):
+    body = await cached_fetch_bytes(session, rss_url, ttl=RSS_TTL_SECONDS)
+    if body is None:
+        return pd.DataFrame()
+    feed = await asyncio.to_thread(feedparser.parse, body)
+    if feed.bozo and not feed.entries:
+        logging.error(f"Error parsing {rss_url}: {feed.bozo_exception!r}")
+    return pd.DataFrame(feed.entries).assign(feed_url=rss_url)
+
+async def get_rss_news(rss_urls):
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        feeds = await asyncio.gather(*(fetch_rss_feed(session, rss_url) for rss_url in rss_urls))
+    return pd.concat(feeds, ignore_index=True)
 
 # Main function
 async def main(args):
     try:
-        player_df = await get_fpl_data()
-        logging.info("Successfully retrieved player data from the API.")
-
-        news_df = await get_news_data()
-        logging.info("Successfully retrieved news data from the API.")
-
-        rss_df = fetch_rss_news(args.rss_url)
-        logging.info("Successfully retrieved RSS news data.")
-
-        # Save the DataFrames
+        # All sources at once: the refresh takes as long as the slowest one
+        start = asyncio.get_running_loop().time()
+        player_df, news_df, rss_df = await asyncio.gather(get_fpl_data(), get_news_data(), get_rss_news(args.rss_url))
+        elapsed = asyncio.get_running_loop().time() - start
+        logging.info(f"Retrieved {len(player_df)} players, {len(news_df)} articles and {len(rss_df)} RSS entries "
+                     f"from {len(args.rss_url)} feeds in {elapsed:.1f}s.")
+
+        # Articles no earlier refresh has seen, verbatim or as an edited copy.
+        # They are only recorded as seen once the whole refresh has succeeded
+        new_news_df, pending = find_new_articles(news_df, args.seen_db)
+        new_rss_df, pending = find_new_articles(rss_df, args.seen_db, url_field="link", pending=pending)
+        logging.info(f"{len(new_news_df)} new articles and {len(new_rss_df)} new RSS entries.")
+
+        # Save the DataFrames: the full batch, so the outputs keep what the
+        # sources currently list however little of it is new
         player_df.to_csv(args.player_output, index=False)
         news_df.to_csv(args.news_output, index=False)
         rss_df.to_csv(args.rss_output, index=False)
 
-        # Filter relevant news
-        players_and_teams = set(player_df["Name"]).union(set(player_df["Team"]))
-        
-        def check_content(content, names):
-            if isinstance(content, str):
-                return any(name.lower() in content.lower() for name in names)
-            return False
-
-        relevant_news_df = news_df[
-            news_df["description"].apply(lambda desc: check_content(desc, players_and_teams)) |
-            news_df["content"].apply(lambda content: check_content(content, players_and_teams))
-        ]
-        relevant_news_df = relevant_news_df.drop_duplicates(subset="description")
-        relevant_news_df.to_csv(args.filtered_news_output, index=False)
-
+        # Keep the history of the player data as a delta against the previous pull
+        delta = record_snapshot(player_df, args.snapshot_dir)
+        logging.info(f"Recorded a snapshot with {len(delta)} changed players in {args.snapshot_dir}.")
+
+        # Injury, suspension and rotation signals from the new articles, folded
+        # into the per-player availability the optimiser reads
+        for articles_df in (new_news_df, new_rss_df):
+            state_df, signals_df = process_new_articles(articles_df, player_df, args.availability_state)
+        logging.info(f"News availability of {len(state_df)} players in {args.availability_state}.")
+
+        # Filter relevant news: one compiled matcher for all player and team
+        # names, one scan per article field, shared with the mention counts.
+        # Only the new articles are scanned; the filtered output keeps the
+        # relevant articles of earlier refreshes
+        matcher = build_name_matcher(set(player_df["Name"]).union(set(player_df["Team"])))
+        mentions = article_mentions(matcher, new_news_df)
+        relevant = mentions["description"].map(bool) | mentions["content"].map(bool)
+        relevant_news_df = new_news_df[relevant].drop_duplicates(subset="description")
+        filtered_news_df = relevant_news_df
+        if os.path.exists(args.filtered_news_output):
+            filtered_news_df = pd.concat([pd.read_csv(args.filtered_news_output), relevant_news_df], ignore_index=True) \
+                .drop_duplicates(subset="description", keep="last")
+        filtered_news_df.to_csv(args.filtered_news_output, index=False)
+
+        mark_seen(pending, args.seen_db)
         logging.info("Data processing completed successfully.")
 
         # Basic data analysis
         print("\nTop 20 players by ROI:")
         print(player_df.sort_values("ROI", ascending=False).head(20)[["Name", "Team", "Cost", "Total Points", "ROI"]])
 
-        print("\nMost mentioned players/teams in news:")
-        mentions = relevant_news_df["description"].apply(lambda desc: [name for name in players_and_teams if isinstance(desc, str) and name.lower() in desc.lower()])
-        mentions = [item for sublist in mentions for item in sublist]
-        print(pd.Series(mentions).value_counts().head(20))
+        print("\nMost mentioned players/teams in new articles:")
+        print(mention_counts(mentions.loc[relevant_news_df.index, "description"]).head(20))
 
     except Exception as e:
         logging.error(f"An error occurred: {str(e)}")
 
 if __name__ == "__main__":
     parser = ArgumentParser(description="Fetch and process FPL and news data")
-    parser.add_argument("--rss_url", default="http://feeds.bbci.co.uk/sport/football/rss.xml", help="RSS feed URL")
+    parser.add_argument("--rss_url", nargs="+", default=RSS_FEEDS, help="RSS feed URLs, fetched concurrently")
     parser.add_argument("--player_output", default="player_data.csv", help="Output file for player data")
     parser.add_argument("--news_output", default="raw_news_data.csv", help="Output file for raw news data")
     parser.add_argument("--rss_output", default="rss_news_data.csv", help="Output file for RSS news data")
+    parser.add_argument("--snapshot_dir", default=SNAPSHOT_DIR, help="Snapshot store of the player data history")
+    parser.add_argument("--seen_db", default=SEEN_DB, help="Seen-store of articles from earlier refreshes")
+    parser.add_argument("--availability_state", default=STATE_FILE, help="Per-player news availability state")
     parser.add_argument("--filtered_news_output", default="filtered_news_data.csv", help="Output file for filtered news data")
     args = parser.parse_args()
 